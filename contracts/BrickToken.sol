@@ -2,28 +2,33 @@
 pragma solidity ^0.8.17;
 
 import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/extensions/draft-ERC20Permit.sol";
 import "./utils/Tradable.sol";
 
-contract BrickToken is Tradable {
+contract BrickToken is Tradable, ERC20Permit {
     uint256 public companyBrick;
     uint256 public aprBrick;
     uint256 public sellSpread;
 
-    constructor(uint256 initialSupply) ERC20("Coincrete", "BRICK") {
+    event ReleasedAprBrick(address admin, address to, uint256 amount);
+
+    constructor(
+        uint256 initialSupply
+    ) ERC20("Coincrete", "BRICK") ERC20Permit("Coincrete") {
         sellSpread = 2500; // 25%
         companyBrick = (initialSupply * 8) / 10;
         buyableTokens = (initialSupply - companyBrick) / 2;
         aprBrick = initialSupply - companyBrick - buyableTokens;
         _mint(address(this), buyableTokens);
-        _mint(address(this), aprBrick); // todo send to NFT contract
+        _mint(address(this), aprBrick); // released with releaseAprBrick
         _mint(msg.sender, companyBrick);
     }
 
-    function buy(uint256 amount, address exchangeToken) public override {
-        require(isTokenAllowed(exchangeToken), "Cannot buy with this token");
-        uint256 valueSent = getValueFromToken(amount, exchangeToken);
-        require(valueSent >= 10 ether, "Amount bought must be more than 10$");
-        super.buy(amount, exchangeToken);
+    function releaseAprBrick(address to, uint256 amount) external onlyOwner {
+        require(amount <= aprBrick, "Amount must be lower than APR reserve");
+        aprBrick -= amount;
+        _transfer(address(this), to, amount);
+        emit ReleasedAprBrick(msg.sender, to, amount);
     }
 
     function setSellSpread(uint256 spread) external onlyOwner {
@@ -34,11 +39,63 @@ contract BrickToken is Tradable {
         sellSpread = spread;
     }
 
+    function _beforeBuy(
+        uint256,
+        address,
+        uint256 value
+    ) internal pure override {
+        require(value >= 10 ether, "Amount bought must be more than 10$");
+    }
+
+    function quoteBuy(
+        uint256[] calldata amounts,
+        address[] calldata tokens
+    ) external view returns (uint256[] memory amountsOut, uint256 available) {
+        require(
+            amounts.length == tokens.length,
+            "Amounts and tokens length mismatch"
+        );
+        (uint256 brickPrice, uint256 brickDecimals) = _getTokenValue(
+            address(this)
+        );
+
+        amountsOut = new uint256[](tokens.length);
+        for (uint256 i = 0; i < tokens.length; i++) {
+            if (!isTokenAllowed(tokens[i])) continue;
+            uint256 value = getValueFromToken(amounts[i], tokens[i]);
+            amountsOut[i] = (value * 10 ** brickDecimals) / brickPrice;
+        }
+
+        return (amountsOut, buyableTokens);
+    }
+
+    function quoteSell(
+        uint256 amount,
+        address[] calldata tokens
+    )
+        external
+        view
+        returns (uint256[] memory amountsOut, uint256[] memory available)
+    {
+        uint256 amountToSell = amount - _sellSpreadOf(amount);
+        uint256 valueSold = getValueFromToken(amountToSell, address(this));
+
+        amountsOut = new uint256[](tokens.length);
+        available = new uint256[](tokens.length);
+        for (uint256 i = 0; i < tokens.length; i++) {
+            available[i] = token_deposit[tokens[i]];
+            if (!isTokenAllowed(tokens[i])) continue;
+            amountsOut[i] = getTokenFromValue(valueSold, tokens[i]);
+        }
+
+        return (amountsOut, available);
+    }
+
     function sell(uint256 amount, address exchangeToken) public override {
-        uint256 amountToKeep = (amount * sellSpread) / 10000;
-        uint256 amountToSell = amount - amountToKeep;
-        super.fillUp(amountToKeep, address(this));
+        _sell(amount, _sellSpreadOf(amount), exchangeToken);
+    }
 
-        super.sell(amountToSell, exchangeToken);
+    function _sellSpreadOf(uint256 amount) internal view returns (uint256) {
+        return (amount * sellSpread) / 10000;
     }
 }
@@ -2,41 +2,202 @@
 pragma solidity ^0.8.17;
 
 import "@openzeppelin/contracts/token/ERC1155/ERC1155.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/utils/SafeERC20.sol";
 import "@openzeppelin/contracts/access/Ownable.sol";
 import "@openzeppelin/contracts/utils/Strings.sol";
+import "@openzeppelin/contracts/utils/Checkpoints.sol";
+import "@openzeppelin/contracts/utils/math/SafeCast.sol";
+import "./utils/interfaces/IAllowTokens.sol";
+import "./utils/interfaces/ITokenValue.sol";
 
 contract CoincreteAsset is ERC1155, Ownable {
     using Strings for string;
+    using SafeERC20 for IERC20;
+    using Checkpoints for Checkpoints.History;
+
+    uint256 private constant _BPS = 10000;
+    uint256 private constant _YEAR = 365 days;
 
     address public _brickToken;
+    string private _uriPrefix;
+    // rent accrues here until rentDistributionStart, then it is paid for
+    // periods of blocks through the RentDistributor Merkle roots
+    uint64 public rentDistributionStart;
+    uint64 public rentDistributionStartBlock;
 
+    // pricePerUnit, APR, currentAmount and maxAmount share a single slot
     struct TokenData {
-        string name; // used to identify the token metadata
-        uint256 pricePerUnit;
-        uint256 APR;
-        uint256 currentAmount;
-        uint256 maxAmount;
+        bytes32 name; // used to identify the token metadata
+        uint96 pricePerUnit;
+        uint32 APR; // basis points
+        uint64 currentAmount;
+        uint64 maxAmount;
+    }
+
+    // rent accrued by one unit since the first transfer, in pricePerUnit * APR * seconds
+    struct RentData {
+        uint192 rentPerUnit;
+        uint64 updatedAt;
     }
 
+    struct CatalogEntry {
+        uint256 tokenID;
+        TokenData data;
+        string uri;
+    }
+
+    uint256[] public catalogTokenIDs;
     mapping(address => bool) public userList;
     mapping(uint256 => TokenData) public tokenID_data;
     mapping(address => uint256) public user_tokenID;
+    mapping(uint256 => RentData) public tokenID_rent;
+    mapping(address => mapping(uint256 => uint256)) private user_tokenID_rentPaid;
+    mapping(address => mapping(uint256 => uint256)) private user_tokenID_rentOwed;
+    mapping(address => mapping(uint256 => Checkpoints.History))
+        private user_tokenID_balances;
+    mapping(uint256 => Checkpoints.History) private tokenID_supplies;
+
+    event ChangedPrice(address admin, uint256 tokenID, uint256 pricePerUnit);
+    event ChangedAPR(address admin, uint256 tokenID, uint256 APR);
+    event ClaimedRent(address user, uint256 value, uint256 amount);
+    event RegisteredTokens(address admin, uint256[] tokenIDs);
+    event StartedRentDistribution(address admin, uint256 blockNumber);
+    event BoughtBatch(
+        address from,
+        address paymentToken,
+        uint256 amountIn,
+        uint256[] tokenIDs,
+        uint256[] amounts
+    );
 
     constructor(
         address brickToken
     ) ERC1155("https://coincrete.com/api/asset/{id}.json") {
         _brickToken = brickToken;
+        _uriPrefix = "https://coincrete.com/api/asset/";
+    }
+
+    function mint(uint256 tokenID, uint256 amount) public onlyOwner {
+        _reserveSupply(tokenID, amount);
+        _mint(msg.sender, tokenID, amount, "");
+    }
+
+    function mintBatch(
+        uint256[] calldata tokenIDs,
+        uint256[] calldata amounts
+    ) public onlyOwner {
+        require(
+            tokenIDs.length == amounts.length,
+            "IDs and amounts length mismatch"
+        );
+        for (uint256 i = 0; i < tokenIDs.length; i++) {
+            _reserveSupply(tokenIDs[i], amounts[i]);
+        }
+        _mintBatch(msg.sender, tokenIDs, amounts, "");
+    }
+
+    function buyBatch(
+        uint256[] calldata tokenIDs,
+        uint256[] calldata amounts,
+        address paymentToken
+    ) external {
+        require(
+            tokenIDs.length == amounts.length,
+            "IDs and amounts length mismatch"
+        );
+        require(
+            IAllowTokens(_brickToken).isTokenAllowed(paymentToken),
+            "Cannot buy with this token"
+        );
+
+        uint256 totalValue = 0;
+        for (uint256 i = 0; i < tokenIDs.length; i++) {
+            require(_exists(tokenIDs[i]), "ERC1155: nonexistent token");
+            uint256 pricePerUnit = tokenID_data[tokenIDs[i]].pricePerUnit;
+            require(pricePerUnit > 0, "Price not set");
+            _reserveSupply(tokenIDs[i], amounts[i]);
+            totalValue += pricePerUnit * amounts[i];
+        }
+
+        uint256 amountIn = ITokenValue(_brickToken).getTokenFromValue(
+            totalValue,
+            paymentToken
+        );
+        // the payment is the only thing gating the mint
+        require(amountIn > 0, "Amount must be more than 0 tokens");
+        IERC20(paymentToken).safeTransferFrom(msg.sender, owner(), amountIn);
+        _mintBatch(msg.sender, tokenIDs, amounts, "");
+
+        emit BoughtBatch(msg.sender, paymentToken, amountIn, tokenIDs, amounts);
     }
 
-    function mint(uint256 tokenID, uint256 amount) public {
+    function _reserveSupply(uint256 tokenID, uint256 amount) internal {
         require(amount > 0, "Cannot mint 0 tokens");
+        TokenData storage data = tokenID_data[tokenID];
         require(
-            tokenID_data[tokenID].currentAmount + amount <=
-                tokenID_data[tokenID].maxAmount,
+            data.currentAmount + amount <= data.maxAmount,
             "Cannot mint more than max amount"
         );
-        _mint(msg.sender, tokenID, amount, "");
-        tokenID_data[tokenID].currentAmount += amount;
+        data.currentAmount += uint64(amount);
+    }
+
+    function registerTokens(
+        TokenData[] calldata data,
+        uint256[] calldata tokenIDs
+    ) external onlyOwner {
+        require(
+            data.length == tokenIDs.length,
+            "Data and IDs length mismatch"
+        );
+        for (uint256 i = 0; i < tokenIDs.length; i++) {
+            _registerToken(tokenIDs[i], data[i]);
+        }
+        emit RegisteredTokens(msg.sender, tokenIDs);
+    }
+
+    // currentAmount is kept from storage, only minting changes it
+    function _registerToken(
+        uint256 tokenID,
+        TokenData calldata newData
+    ) internal {
+        require(newData.name != bytes32(0), "Name cannot be empty");
+        uint64 currentAmount = tokenID_data[tokenID].currentAmount;
+        require(
+            newData.maxAmount >= currentAmount,
+            "Max amount lower than current amount"
+        );
+
+        if (!_exists(tokenID)) catalogTokenIDs.push(tokenID);
+
+        _updateRent(tokenID);
+        tokenID_data[tokenID] = TokenData(
+            newData.name,
+            newData.pricePerUnit,
+            newData.APR,
+            currentAmount,
+            newData.maxAmount
+        );
+    }
+
+    function catalogLength() external view returns (uint256) {
+        return catalogTokenIDs.length;
+    }
+
+    function getCatalog(
+        uint256 offset,
+        uint256 limit
+    ) external view returns (CatalogEntry[] memory) {
+        if (offset >= catalogTokenIDs.length) return new CatalogEntry[](0);
+        uint256 size = catalogTokenIDs.length - offset;
+        if (limit < size) size = limit;
+
+        CatalogEntry[] memory page = new CatalogEntry[](size);
+        for (uint256 i = 0; i < size; i++) {
+            uint256 tokenID = catalogTokenIDs[offset + i];
+            page[i] = CatalogEntry(tokenID, tokenID_data[tokenID], uri(tokenID));
+        }
+        return page;
     }
 
     function totalSupply(uint256 tokenID) external view returns (uint256) {
@@ -47,16 +208,176 @@ contract CoincreteAsset is ERC1155, Ownable {
         uint256 tokenID,
         uint256 amount
     ) external onlyOwner {
-        tokenID_data[tokenID].maxAmount = amount;
+        require(
+            amount >= tokenID_data[tokenID].currentAmount,
+            "Max amount lower than current amount"
+        );
+        tokenID_data[tokenID].maxAmount = SafeCast.toUint64(amount);
+    }
+
+    function setPricePerUnit(
+        uint256 tokenID,
+        uint256 pricePerUnit
+    ) external onlyOwner {
+        _updateRent(tokenID);
+        tokenID_data[tokenID].pricePerUnit = SafeCast.toUint96(pricePerUnit);
+        emit ChangedPrice(msg.sender, tokenID, pricePerUnit);
+    }
+
+    function setAPR(uint256 tokenID, uint256 APR) external onlyOwner {
+        _updateRent(tokenID);
+        tokenID_data[tokenID].APR = SafeCast.toUint32(APR);
+        emit ChangedAPR(msg.sender, tokenID, APR);
+    }
+
+    function claim(uint256[] calldata tokenIDs) external {
+        uint256 owed = 0;
+        for (uint256 i = 0; i < tokenIDs.length; i++) {
+            _updateRent(tokenIDs[i]);
+            _checkpointRent(msg.sender, tokenIDs[i]);
+            owed += user_tokenID_rentOwed[msg.sender][tokenIDs[i]];
+            delete user_tokenID_rentOwed[msg.sender][tokenIDs[i]];
+        }
+
+        uint256 value = owed / (_BPS * _YEAR);
+        require(value > 0, "No rent to claim");
+
+        uint256 amount = ITokenValue(_brickToken).getTokenFromValue(
+            value,
+            _brickToken
+        );
+        IERC20(_brickToken).transfer(msg.sender, amount);
+
+        emit ClaimedRent(msg.sender, value, amount);
+    }
+
+    // Stops the on-chain accrual: rent accrued so far can still be claimed,
+    // later rent is only paid by the RentDistributor, never by both
+    function startRentDistribution() external onlyOwner {
+        require(
+            rentDistributionStart == 0,
+            "Rent distribution already started"
+        );
+        rentDistributionStart = uint64(block.timestamp);
+        rentDistributionStartBlock = uint64(block.number);
+        emit StartedRentDistribution(msg.sender, block.number);
+    }
+
+    function pendingRent(
+        address user,
+        uint256 tokenID
+    ) external view returns (uint256) {
+        uint256 rentPerUnit = tokenID_rent[tokenID].rentPerUnit +
+            _rentSinceUpdate(tokenID);
+        uint256 owed = user_tokenID_rentOwed[user][tokenID] +
+            balanceOf(user, tokenID) *
+            (rentPerUnit - user_tokenID_rentPaid[user][tokenID]);
+        return owed / (_BPS * _YEAR);
+    }
+
+    function _updateRent(uint256 tokenID) internal {
+        RentData storage rent = tokenID_rent[tokenID];
+        rent.rentPerUnit += uint192(_rentSinceUpdate(tokenID));
+        rent.updatedAt = uint64(block.timestamp);
+    }
+
+    function _rentSinceUpdate(uint256 tokenID) internal view returns (uint256) {
+        uint256 updatedAt = tokenID_rent[tokenID].updatedAt;
+        uint256 accruesUntil = block.timestamp;
+        if (rentDistributionStart != 0 && rentDistributionStart < accruesUntil)
+            accruesUntil = rentDistributionStart;
+        if (updatedAt == 0 || updatedAt >= accruesUntil) return 0;
+
+        TokenData storage data = tokenID_data[tokenID];
+        return
+            uint256(data.pricePerUnit) *
+            data.APR *
+            (accruesUntil - updatedAt);
+    }
+
+    function _checkpointRent(address user, uint256 tokenID) internal {
+        uint256 rentPerUnit = tokenID_rent[tokenID].rentPerUnit;
+        user_tokenID_rentOwed[user][tokenID] +=
+            balanceOf(user, tokenID) *
+            (rentPerUnit - user_tokenID_rentPaid[user][tokenID]);
+        user_tokenID_rentPaid[user][tokenID] = rentPerUnit;
+    }
+
+    function _beforeTokenTransfer(
+        address operator,
+        address from,
+        address to,
+        uint256[] memory ids,
+        uint256[] memory amounts,
+        bytes memory data
+    ) internal override {
+        super._beforeTokenTransfer(operator, from, to, ids, amounts, data);
+
+        for (uint256 i = 0; i < ids.length; i++) {
+            _updateRent(ids[i]);
+            if (from != address(0)) _checkpointRent(from, ids[i]);
+            if (to != address(0)) _checkpointRent(to, ids[i]);
+        }
+    }
+
+    function _afterTokenTransfer(
+        address operator,
+        address from,
+        address to,
+        uint256[] memory ids,
+        uint256[] memory amounts,
+        bytes memory data
+    ) internal override {
+        super._afterTokenTransfer(operator, from, to, ids, amounts, data);
+
+        for (uint256 i = 0; i < ids.length; i++) {
+            if (from != address(0))
+                user_tokenID_balances[from][ids[i]].push(balanceOf(from, ids[i]));
+            if (to != address(0))
+                user_tokenID_balances[to][ids[i]].push(balanceOf(to, ids[i]));
+            if (from == address(0) || to == address(0))
+                tokenID_supplies[ids[i]].push(tokenID_data[ids[i]].currentAmount);
+        }
+    }
+
+    function balanceOfAt(
+        address user,
+        uint256 tokenID,
+        uint256 blockNumber
+    ) external view returns (uint256) {
+        return user_tokenID_balances[user][tokenID].getAtBlock(blockNumber);
+    }
+
+    function totalSupplyAt(
+        uint256 tokenID,
+        uint256 blockNumber
+    ) external view returns (uint256) {
+        return tokenID_supplies[tokenID].getAtBlock(blockNumber);
     }
 
     function uri(uint256 tokenId) public view override returns (string memory) {
         require(_exists(tokenId), "ERC1155: nonexistent token");
-        string memory tokenUri = replaceString(
-            uri(tokenId),
-            tokenID_data[tokenId].name
-        );
-        return tokenUri;
+        return
+            string.concat(
+                _uriPrefix,
+                _nameToString(tokenID_data[tokenId].name),
+                ".json"
+            );
+    }
+
+    function uris(
+        uint256[] calldata tokenIds
+    ) external view returns (string[] memory) {
+        string[] memory tokenUris = new string[](tokenIds.length);
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            tokenUris[i] = uri(tokenIds[i]);
+        }
+        return tokenUris;
+    }
+
+    function setURIPrefix(string calldata prefix) external onlyOwner {
+        _uriPrefix = prefix;
+        _setURI(string.concat(prefix, "{id}.json"));
     }
 
     function setTokenURI(
@@ -64,31 +385,22 @@ contract CoincreteAsset is ERC1155, Ownable {
         string memory fileName
     ) external onlyOwner {
         require(_exists(tokenId), "ERC1155: nonexistent token");
-        tokenID_data[tokenId].name = fileName;
+        require(bytes(fileName).length > 0, "Name cannot be empty");
+        require(bytes(fileName).length <= 32, "Name longer than 32 bytes");
+        tokenID_data[tokenId].name = bytes32(bytes(fileName));
     }
 
     function _exists(uint256 tokenId) internal view returns (bool) {
-        return bytes(tokenID_data[tokenId].name).length > 0;
-    }
-
-    function replaceString(
-        string memory str,
-        string memory tokenID
-    ) internal pure returns (string memory) {
-        str = substring(str, 0, bytes(str).length - 3);
-        str = string(abi.encodePacked(str, tokenID, ".json"));
-        return str;
-    }
-
-    function substring(
-        string memory str,
-        uint startIndex,
-        uint endIndex
-    ) internal pure returns (string memory) {
-        bytes memory strBytes = bytes(str);
-        bytes memory result = new bytes(endIndex - startIndex);
-        for (uint i = startIndex; i < endIndex; i++) {
-            result[i - startIndex] = strBytes[i];
+        return tokenID_data[tokenId].name != bytes32(0);
+    }
+
+    function _nameToString(bytes32 name) internal pure returns (string memory) {
+        uint256 length = 0;
+        while (length < 32 && name[length] != 0) length++;
+
+        bytes memory result = abi.encodePacked(name);
+        assembly {
+            mstore(result, length)
         }
         return string(result);
     }
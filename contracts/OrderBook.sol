@@ -2,10 +2,10 @@
 pragma solidity ^0.8.17;
 
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "./utils/PermitHelper.sol";
 import "./interfaces/IOrderBook.sol";
 
 //security avoid reentrancy attacks
-//todo add and test events
 //todo manage erc-1155 tokens
 
 contract OrderBook is IOrderBook {
@@ -51,6 +51,31 @@ contract OrderBook is IOrderBook {
     // stack of all open bids ordered by pricePerUnit desc, [length-1] is the best
     uint256[] public openBidsStack;
 
+    event OrderPlaced(
+        uint256 indexed orderId,
+        address indexed maker,
+        uint256 indexed price,
+        uint256 amount,
+        Type orderType
+    );
+    event OrderMatched(
+        uint256 indexed bidId,
+        uint256 indexed askId,
+        uint256 indexed price,
+        uint256 amount
+    );
+    event OrderFilled(
+        uint256 indexed orderId,
+        address indexed maker,
+        uint256 indexed price
+    );
+    event OrderCancelled(
+        uint256 indexed orderId,
+        address indexed maker,
+        uint256 indexed price,
+        uint256 amount
+    );
+
     constructor(address _bookToken, address _priceToken) {
         _id = 1;
         bookToken = _bookToken;
@@ -62,27 +87,68 @@ contract OrderBook is IOrderBook {
         require(_amount > 0, "Amount must be greater than zero");
         require(openAsksStack.length > 0, "No open asks");
 
-        _marketOrder(_amount, Type.MarketBuy, price_openAsks, openAsksStack);
+        _marketOrder(
+            _amount,
+            _MAX_UINT,
+            Type.MarketBuy,
+            price_openAsks,
+            openAsksStack
+        );
     }
 
     function marketSell(uint256 _amount) public {
         require(_amount > 0, "Amount must be greater than zero");
         require(openBidsStack.length > 0, "No open bids");
 
-        _marketOrder(_amount, Type.MarketSell, price_openBids, openBidsStack);
+        _marketOrder(_amount, 0, Type.MarketSell, price_openBids, openBidsStack);
+    }
+
+    function limitBuy(uint256 _price, uint256 _amount) external {
+        require(_price > 0, "Price must be greater than zero");
+        require(_amount > 0, "Amount must be greater than zero");
+
+        if (_price <= bestAskPrice()) {
+            addBid(_price, _amount);
+            return;
+        }
+
+        _marketOrder(
+            _amount,
+            _price,
+            Type.MarketBuy,
+            price_openAsks,
+            openAsksStack
+        );
+    }
+
+    function limitSell(uint256 _price, uint256 _amount) external {
+        require(_price > 0, "Price must be greater than zero");
+        require(_amount > 0, "Amount must be greater than zero");
+
+        if (_price >= bestBidPrice()) {
+            addAsk(_price, _amount);
+            return;
+        }
+
+        _marketOrder(
+            _amount,
+            _price,
+            Type.MarketSell,
+            price_openBids,
+            openBidsStack
+        );
     }
 
     function _marketOrder(
         uint256 _amount,
+        uint256 _limitPrice,
         Type _orderType,
         mapping(uint256 => uint256[]) storage openOrders,
         uint256[] storage openOrdersStack
     ) internal {
-        uint256 maxPrice = _orderType == Type.MarketBuy ? _MAX_UINT : 0;
-
         orderID_order[_id] = Order(
             msg.sender,
-            maxPrice,
+            _limitPrice,
             _amount,
             _amount,
             _orderType,
@@ -93,6 +159,14 @@ contract OrderBook is IOrderBook {
 
         Order storage newOrder = orderID_order[_id];
         user_ordersId[msg.sender].push(_id);
+        // market orders carry a sentinel limit, emitted as price 0
+        emit OrderPlaced(
+            _id,
+            msg.sender,
+            _limitPrice == _MAX_UINT ? 0 : _limitPrice,
+            _amount,
+            _orderType
+        );
 
         uint256 bestPrice = _orderType == Type.MarketBuy
             ? bestAskPrice()
@@ -101,8 +175,7 @@ contract OrderBook is IOrderBook {
         uint256 i = 0;
         while (
             newOrder.status != Status.Filled &&
-            ((_orderType == Type.MarketBuy && bestPrice < maxPrice) ||
-                (_orderType == Type.MarketSell && bestPrice > maxPrice))
+            _isMarketable(bestPrice, _limitPrice, _orderType)
         ) {
             uint256 bestOrderId = openOrders[bestPrice][i];
             Order storage bestOrder = orderID_order[bestOrderId];
@@ -123,28 +196,29 @@ contract OrderBook is IOrderBook {
             }
         }
 
-        _skip(openOrders[bestPrice], i);
-
-        uint256 totalAmount = 0;
-        uint256 totalValue = 0;
-        for (uint256 k = 0; k < orderID_matches[_id].length; k++) {
-            Match memory thisMatch = orderID_matches[_id][k];
-            totalValue += thisMatch.price * thisMatch.amount;
-            totalAmount += thisMatch.amount;
-        }
+        if (i > 0) openOrders[bestPrice] = _skip(openOrders[bestPrice], i);
 
-        newOrder.pricePerUnit = totalAmount == 0 ? 0 : totalValue / totalAmount;
+        // the taker is reported once, at the average price of its matches
+        newOrder.pricePerUnit = _averageMatchPrice(_id);
+        if (newOrder.status == Status.Filled)
+            emit OrderFilled(_id, msg.sender, newOrder.pricePerUnit);
 
         _id++;
 
         if (newOrder.status == Status.Open) {
             uint256 remainder = newOrder.amount;
             _fillOrder(newOrder, _id - 1);
+            emit OrderFilled(_id - 1, msg.sender, newOrder.pricePerUnit);
             newOrder.amount = remainder;
 
+            // market orders have no limit and rest at the last traded price
+            uint256 restingPrice = _limitPrice == _MAX_UINT || _limitPrice == 0
+                ? marketPrice
+                : _limitPrice;
+
             if (_orderType == Type.MarketBuy) {
                 OrderParams memory orderParams = OrderParams(
-                    marketPrice,
+                    restingPrice,
                     remainder,
                     Type.Bid,
                     priceToken
@@ -158,7 +232,7 @@ contract OrderBook is IOrderBook {
                 );
             } else {
                 OrderParams memory orderParams = OrderParams(
-                    marketPrice,
+                    restingPrice,
                     remainder,
                     Type.Ask,
                     bookToken
@@ -174,7 +248,31 @@ contract OrderBook is IOrderBook {
         }
     }
 
-    function addBid(uint256 _price, uint256 _amount) external {
+    function _isMarketable(
+        uint256 _bestPrice,
+        uint256 _limitPrice,
+        Type _orderType
+    ) private pure returns (bool) {
+        if (_orderType == Type.MarketBuy)
+            return _bestPrice < _MAX_UINT && _bestPrice <= _limitPrice;
+        return _bestPrice > 0 && _bestPrice >= _limitPrice;
+    }
+
+    function _averageMatchPrice(
+        uint256 orderId
+    ) private view returns (uint256) {
+        uint256 totalAmount = 0;
+        uint256 totalValue = 0;
+        for (uint256 k = 0; k < orderID_matches[orderId].length; k++) {
+            Match memory thisMatch = orderID_matches[orderId][k];
+            totalValue += thisMatch.price * thisMatch.amount;
+            totalAmount += thisMatch.amount;
+        }
+
+        return totalAmount == 0 ? 0 : totalValue / totalAmount;
+    }
+
+    function addBid(uint256 _price, uint256 _amount) public {
         require(_price > 0, "Price must be greater than zero");
         require(_amount > 0, "Amount must be greater than zero");
         require(
@@ -198,7 +296,7 @@ contract OrderBook is IOrderBook {
         );
     }
 
-    function addAsk(uint256 _price, uint256 _amount) external {
+    function addAsk(uint256 _price, uint256 _amount) public {
         require(_price > 0, "Price must be greater than zero");
         require(_amount > 0, "Amount must be greater than zero");
         require(
@@ -222,6 +320,48 @@ contract OrderBook is IOrderBook {
         );
     }
 
+    function addBidWithPermit(
+        uint256 _price,
+        uint256 _amount,
+        uint256 _deadline,
+        uint8 _v,
+        bytes32 _r,
+        bytes32 _s
+    ) external {
+        PermitHelper.tryPermit(
+            priceToken,
+            msg.sender,
+            address(this),
+            (_amount * _price) / 1e18,
+            _deadline,
+            _v,
+            _r,
+            _s
+        );
+        addBid(_price, _amount);
+    }
+
+    function addAskWithPermit(
+        uint256 _price,
+        uint256 _amount,
+        uint256 _deadline,
+        uint8 _v,
+        bytes32 _r,
+        bytes32 _s
+    ) external {
+        PermitHelper.tryPermit(
+            bookToken,
+            msg.sender,
+            address(this),
+            _amount,
+            _deadline,
+            _v,
+            _r,
+            _s
+        );
+        addAsk(_price, _amount);
+    }
+
     function _addLimitOrder(
         OrderParams memory orderParams,
         mapping(uint256 => uint256[]) storage openOrders,
@@ -242,6 +382,13 @@ contract OrderBook is IOrderBook {
 
         Order storage newOrder = orderID_order[_id];
         user_ordersId[msg.sender].push(_id);
+        emit OrderPlaced(
+            _id,
+            msg.sender,
+            orderParams.price,
+            orderParams.amount,
+            orderParams.orderType
+        );
 
         uint256 transferAmount = orderParams.orderType == Type.Bid
             ? (orderParams.amount * orderParams.price) / 1e18
@@ -355,6 +502,13 @@ contract OrderBook is IOrderBook {
             );
         }
         marketPrice = ask.pricePerUnit;
+
+        emit OrderMatched(bidId, askId, ask.pricePerUnit, matchedBookTokens);
+        // takers emit OrderFilled from _marketOrder once every level is swept
+        if (bid.status == Status.Filled && bid.orderType != Type.MarketBuy)
+            emit OrderFilled(bidId, bid.maker, bid.pricePerUnit);
+        if (ask.status == Status.Filled && ask.orderType != Type.MarketSell)
+            emit OrderFilled(askId, ask.maker, ask.pricePerUnit);
     }
 
     function _fillOrder(Order storage order, uint256 orderId) internal {
@@ -415,6 +569,38 @@ contract OrderBook is IOrderBook {
         return liquidityDepth;
     }
 
+    function getOrdersAtPrice(
+        uint256 price,
+        Type side,
+        uint256 offset,
+        uint256 limit
+    ) external view returns (QueuedOrder[] memory) {
+        require(side == Type.Bid || side == Type.Ask, "Side must be Bid or Ask");
+
+        uint256[] storage openOrders = side == Type.Bid
+            ? price_openBids[price]
+            : price_openAsks[price];
+
+        if (offset >= openOrders.length) return new QueuedOrder[](0);
+        uint256 size = openOrders.length - offset;
+        if (limit < size) size = limit;
+
+        uint256 amountAhead = 0;
+        for (uint256 i = 0; i < offset; i++) {
+            amountAhead += orderID_order[openOrders[i]].amount;
+        }
+
+        QueuedOrder[] memory page = new QueuedOrder[](size);
+        for (uint256 i = 0; i < size; i++) {
+            uint256 orderId = openOrders[offset + i];
+            Order storage order = orderID_order[orderId];
+            page[i] = QueuedOrder(orderId, order.maker, order.amount, amountAhead);
+            amountAhead += order.amount;
+        }
+
+        return page;
+    }
+
     function getMarketOrderAveragePrice(
         uint256 amount,
         Type orderType
@@ -469,6 +655,12 @@ contract OrderBook is IOrderBook {
         Order storage order = orderID_order[orderID];
         order.status = Status.Cancelled;
         order.timestampClose = block.timestamp;
+        emit OrderCancelled(
+            orderID,
+            order.maker,
+            order.pricePerUnit,
+            order.amount
+        );
 
         if (order.orderType == Type.Bid) {
             uint256[] storage openBids = price_openBids[order.pricePerUnit];
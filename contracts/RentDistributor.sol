@@ -0,0 +1,82 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.17;
+
+import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
+
+contract RentDistributor is Ownable {
+    address public brickToken;
+    uint256 public currentPeriod;
+
+    mapping(uint256 => bytes32) public period_root;
+    // last block covered by each period, the next period starts after it
+    mapping(uint256 => uint256) public period_toBlock;
+    // one bit per leaf index, 256 leaves per word
+    mapping(uint256 => mapping(uint256 => uint256)) private period_claimed;
+
+    event SetDistributionRoot(
+        address admin,
+        uint256 period,
+        bytes32 root,
+        uint256 toBlock
+    );
+    event Claimed(
+        uint256 period,
+        uint256 index,
+        address account,
+        uint256 amount
+    );
+
+    constructor(address _brickToken) {
+        brickToken = _brickToken;
+    }
+
+    // The rent of a period is computed off-chain by scripts/distribute_rent.py
+    // from the balances held after the previous period up to toBlock
+    function setDistributionRoot(
+        bytes32 root,
+        uint256 toBlock
+    ) external onlyOwner {
+        require(root != bytes32(0), "Root cannot be empty");
+        require(
+            toBlock > period_toBlock[currentPeriod] && toBlock < block.number,
+            "Invalid period end"
+        );
+        currentPeriod++;
+        period_root[currentPeriod] = root;
+        period_toBlock[currentPeriod] = toBlock;
+        emit SetDistributionRoot(msg.sender, currentPeriod, root, toBlock);
+    }
+
+    function isClaimed(
+        uint256 period,
+        uint256 index
+    ) public view returns (bool) {
+        uint256 word = period_claimed[period][index / 256];
+        return word & (1 << (index % 256)) != 0;
+    }
+
+    function claim(
+        uint256 period,
+        uint256 index,
+        address account,
+        uint256 amount,
+        bytes32[] calldata proof
+    ) external {
+        require(period_root[period] != bytes32(0), "Unknown period");
+        require(!isClaimed(period, index), "Rent already claimed");
+
+        // 96 bytes preimage, cannot be mistaken for a 64 bytes inner node
+        bytes32 leaf = keccak256(abi.encode(index, account, amount));
+        require(
+            MerkleProof.verifyCalldata(proof, period_root[period], leaf),
+            "Invalid proof"
+        );
+
+        period_claimed[period][index / 256] |= 1 << (index % 256);
+        IERC20(brickToken).transfer(account, amount);
+
+        emit Claimed(period, index, account, amount);
+    }
+}
@@ -15,14 +15,43 @@ interface IOrderBook {
         Cancelled
     }
 
+    struct QueuedOrder {
+        uint256 orderId;
+        address maker;
+        uint256 amount;
+        uint256 amountAhead;
+    }
+
     function addBid(uint256 price, uint256 amount) external;
 
     function addAsk(uint256 price, uint256 amount) external;
 
+    function addBidWithPermit(
+        uint256 price,
+        uint256 amount,
+        uint256 deadline,
+        uint8 v,
+        bytes32 r,
+        bytes32 s
+    ) external;
+
+    function addAskWithPermit(
+        uint256 price,
+        uint256 amount,
+        uint256 deadline,
+        uint8 v,
+        bytes32 r,
+        bytes32 s
+    ) external;
+
     function marketBuy(uint256 amount) external;
 
     function marketSell(uint256 amount) external;
 
+    function limitBuy(uint256 price, uint256 amount) external;
+
+    function limitSell(uint256 price, uint256 amount) external;
+
     function cancelOrder(uint256 orderID) external;
 
     function bestBidPrice() external view returns (uint256);
@@ -33,6 +62,13 @@ interface IOrderBook {
         uint256 price
     ) external view returns (uint256);
 
+    function getOrdersAtPrice(
+        uint256 price,
+        Type side,
+        uint256 offset,
+        uint256 limit
+    ) external view returns (QueuedOrder[] memory);
+
     function getMarketOrderAveragePrice(
         uint256 amount,
         Type orderType
@@ -0,0 +1,28 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+/**
+ * @title MockMulticall
+ * @notice Same aggregate interface as MakerDAO's Multicall and Multicall3,
+ * used on local chains to batch many view calls into a single eth_call
+ */
+contract MockMulticall {
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    function aggregate(
+        Call[] calldata calls
+    ) public returns (uint256 blockNumber, bytes[] memory returnData) {
+        blockNumber = block.number;
+        returnData = new bytes[](calls.length);
+        for (uint256 i = 0; i < calls.length; i++) {
+            (bool success, bytes memory ret) = calls[i].target.call(
+                calls[i].callData
+            );
+            require(success, "Multicall: call failed");
+            returnData[i] = ret;
+        }
+    }
+}
@@ -2,9 +2,13 @@
 pragma solidity ^0.8.0;
 
 import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/extensions/draft-ERC20Permit.sol";
 
-contract MockERC20 is ERC20 {
-    constructor(string memory name, string memory ticker) ERC20(name, ticker) {}
+contract MockERC20 is ERC20Permit {
+    constructor(
+        string memory name,
+        string memory ticker
+    ) ERC20(name, ticker) ERC20Permit(name) {}
 
     function mint(address account, uint256 amount) public {
         _mint(account, amount);
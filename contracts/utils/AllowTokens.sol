@@ -6,48 +6,36 @@ import "@openzeppelin/contracts/access/Ownable.sol";
 
 contract AllowTokens is IAllowTokens, Ownable {
     address[] public allowedTokens;
+    // 1-based position in allowedTokens, 0 means not allowed
+    mapping(address => uint256) private token_allowedIndex;
 
     event AllowToken(address admin, address token);
     event DisallowToken(address admin, address token);
 
     function addAllowedToken(address token) external override onlyOwner {
-        bool exists = false;
-        for (uint256 i = 0; i < allowedTokens.length; i++) {
-            if (allowedTokens[i] == token) {
-                exists = true;
-                break;
-            }
-        }
-        require(!exists, "The token is already allowed");
+        require(
+            token_allowedIndex[token] == 0,
+            "The token is already allowed"
+        );
 
         allowedTokens.push(token);
+        token_allowedIndex[token] = allowedTokens.length;
         emit AllowToken(msg.sender, token);
     }
 
     function removeAllowedToken(address token) external override onlyOwner {
-        uint256 tokenIndex = allowedTokens.length;
-        for (uint256 i = 0; i < allowedTokens.length; i++) {
-            if (allowedTokens[i] == token) {
-                tokenIndex = i;
-                break;
-            }
-        }
-        require(
-            tokenIndex < allowedTokens.length,
-            "The token is already unallowed"
-        );
+        uint256 tokenIndex = token_allowedIndex[token];
+        require(tokenIndex > 0, "The token is already unallowed");
 
-        allowedTokens[tokenIndex] = allowedTokens[allowedTokens.length - 1];
+        address lastToken = allowedTokens[allowedTokens.length - 1];
+        allowedTokens[tokenIndex - 1] = lastToken;
+        token_allowedIndex[lastToken] = tokenIndex;
         allowedTokens.pop();
+        delete token_allowedIndex[token];
         emit DisallowToken(msg.sender, token);
     }
 
     function isTokenAllowed(address token) public view override returns (bool) {
-        for (uint256 i = 0; i < allowedTokens.length; i++) {
-            if (allowedTokens[i] == token) {
-                return true;
-            }
-        }
-        return false;
+        return token_allowedIndex[token] > 0;
     }
 }
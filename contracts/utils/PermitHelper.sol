@@ -0,0 +1,37 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/extensions/draft-IERC20Permit.sol";
+
+library PermitHelper {
+    // A permit can be front-run by anyone replaying the signature, which
+    // burns its nonce: go on if the allowance it granted is already there
+    function tryPermit(
+        address token,
+        address owner,
+        address spender,
+        uint256 amount,
+        uint256 deadline,
+        uint8 v,
+        bytes32 r,
+        bytes32 s
+    ) internal {
+        try
+            IERC20Permit(token).permit(
+                owner,
+                spender,
+                amount,
+                deadline,
+                v,
+                r,
+                s
+            )
+        {} catch {
+            require(
+                IERC20(token).allowance(owner, spender) >= amount,
+                "Permit failed"
+            );
+        }
+    }
+}
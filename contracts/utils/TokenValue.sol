@@ -2,32 +2,48 @@
 pragma solidity ^0.8.0;
 
 import "@chainlink/contracts/src/v0.8/interfaces/AggregatorV3Interface.sol";
+import "@openzeppelin/contracts/access/Ownable.sol";
 import "./interfaces/ITokenValue.sol";
 
-contract TokenValue is ITokenValue {
+contract TokenValue is ITokenValue, Ownable {
     mapping(address => address) public token_priceFeed;
+    // max age in seconds of a feed answer, 0 disables the staleness check
+    mapping(address => uint256) public token_heartbeat;
+    mapping(address => uint8) private token_feedDecimals;
 
     event AddedPriceFeed(address admin, address token, address priceFeed);
     event RemovedPriceFeed(address admin, address token);
+    event SetHeartbeat(address admin, address token, uint256 heartbeat);
 
     function setTokenPriceFeed(
         address token,
         address priceFeed
-    ) public override {
+    ) public override onlyOwner {
         token_priceFeed[token] = priceFeed;
+        token_feedDecimals[token] = AggregatorV3Interface(priceFeed).decimals();
         emit AddedPriceFeed(msg.sender, token, priceFeed);
     }
 
-    function removeTokenPriceFeed(address token) external override {
+    function removeTokenPriceFeed(address token) external override onlyOwner {
         delete token_priceFeed[token];
+        delete token_feedDecimals[token];
+        delete token_heartbeat[token];
         emit RemovedPriceFeed(msg.sender, token);
     }
 
+    function setTokenHeartbeat(
+        address token,
+        uint256 heartbeat
+    ) external override onlyOwner {
+        token_heartbeat[token] = heartbeat;
+        emit SetHeartbeat(msg.sender, token, heartbeat);
+    }
+
     function getValueFromToken(
         uint256 amount,
         address token
     ) public view override returns (uint256) {
-        (uint256 price, uint256 decimals) = getTokenValue(token);
+        (uint256 price, uint256 decimals) = _getTokenValue(token);
         return (amount * price) / 10 ** (decimals);
     }
 
@@ -35,19 +51,56 @@ contract TokenValue is ITokenValue {
         uint256 amount,
         address token
     ) public view override returns (uint256) {
-        (uint256 price, uint256 decimals) = getTokenValue(token);
+        (uint256 price, uint256 decimals) = _getTokenValue(token);
         return (amount * 10 ** decimals) / price;
     }
 
+    function getTokenFromToken(
+        uint256 amount,
+        address fromToken,
+        address toToken
+    ) public view override returns (uint256) {
+        (, uint256 amountOut) = _getTokenFromToken(amount, fromToken, toToken);
+        return amountOut;
+    }
+
     function getTokenValue(
         address token
     ) public view override returns (uint256, uint256) {
-        address tokenPriceFeed = token_priceFeed[token];
-        AggregatorV3Interface priceFeed = AggregatorV3Interface(tokenPriceFeed);
+        return _getTokenValue(token);
+    }
+
+    // Converts through USD with the same rounding as getValueFromToken
+    // followed by getTokenFromValue, reading each feed once.
+    function _getTokenFromToken(
+        uint256 amount,
+        address fromToken,
+        address toToken
+    ) internal view returns (uint256 value, uint256 amountOut) {
+        (uint256 fromPrice, uint256 fromDecimals) = _getTokenValue(fromToken);
+        value = (amount * fromPrice) / 10 ** fromDecimals;
+
+        (uint256 toPrice, uint256 toDecimals) = fromToken == toToken
+            ? (fromPrice, fromDecimals)
+            : _getTokenValue(toToken);
+        amountOut = (value * 10 ** toDecimals) / toPrice;
+    }
+
+    function _getTokenValue(
+        address token
+    ) internal view returns (uint256, uint256) {
+        AggregatorV3Interface priceFeed = AggregatorV3Interface(
+            token_priceFeed[token]
+        );
 
-        (, int256 price, , , ) = priceFeed.latestRoundData();
-        uint256 decimals = priceFeed.decimals();
+        (, int256 price, , uint256 updatedAt, ) = priceFeed.latestRoundData();
+        require(price > 0, "Invalid price");
+        uint256 heartbeat = token_heartbeat[token];
+        require(
+            heartbeat == 0 || block.timestamp - updatedAt <= heartbeat,
+            "Stale price"
+        );
 
-        return (uint256(price), decimals);
+        return (uint256(price), token_feedDecimals[token]);
     }
 }
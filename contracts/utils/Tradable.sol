@@ -3,6 +3,7 @@ pragma solidity ^0.8.17;
 
 import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "./PermitHelper.sol";
 import "./interfaces/ITradable.sol";
 import "./AllowTokens.sol";
 import "./TokenValue.sol";
@@ -11,6 +12,10 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
     uint256 public buyableTokens;
     address[] public tokenWithDeposits;
     mapping(address => uint256) public token_deposit;
+    // 1-based position in tokenWithDeposits, 0 means no deposit
+    mapping(address => uint256) private token_depositIndex;
+    // cashed out deposits waiting for withdrawTreasury
+    mapping(address => uint256) public token_owed;
 
     event Bought(
         address from,
@@ -19,9 +24,11 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
         uint256 amountOut
     );
     event CashedOut(address admin);
+    event WithdrewTreasury(address admin, address token, uint256 amount);
     event Sold(
         address from,
         uint256 amountIn,
+        uint256 amountKept,
         address exchangeToken,
         uint256 amountOut
     );
@@ -29,18 +36,20 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
 
     function buy(uint256 amount, address exchangeToken) public virtual {
         require(isTokenAllowed(exchangeToken), "Cannot buy with this token");
+        (uint256 valueSent, uint256 buyedTokens) = _getTokenFromToken(
+            amount,
+            exchangeToken,
+            address(this)
+        );
+        _beforeBuy(amount, exchangeToken, valueSent);
         require(amount > 0, "Amount must be more than 0 tokens");
         require(
             amount <= buyableTokens,
             "Amount must be lower than available tokens"
         );
 
-        if (token_deposit[exchangeToken] == 0)
-            tokenWithDeposits.push(exchangeToken);
+        if (token_deposit[exchangeToken] == 0) addTokenDeposit(exchangeToken);
         token_deposit[exchangeToken] += amount;
-
-        uint256 valueSent = getValueFromToken(amount, exchangeToken);
-        uint256 buyedTokens = getTokenFromValue(valueSent, address(this));
         buyableTokens -= buyedTokens;
 
         IERC20(exchangeToken).transferFrom(msg.sender, address(this), amount);
@@ -49,6 +58,27 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
         emit Bought(msg.sender, exchangeToken, amount, buyedTokens);
     }
 
+    function buyWithPermit(
+        uint256 amount,
+        address exchangeToken,
+        uint256 deadline,
+        uint8 v,
+        bytes32 r,
+        bytes32 s
+    ) external {
+        PermitHelper.tryPermit(
+            exchangeToken,
+            msg.sender,
+            address(this),
+            amount,
+            deadline,
+            v,
+            r,
+            s
+        );
+        buy(amount, exchangeToken);
+    }
+
     function cashOut() external onlyOwner {
         for (uint256 i = 0; i < tokenWithDeposits.length; i++) {
             IERC20(tokenWithDeposits[i]).transfer(
@@ -56,18 +86,71 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
                 token_deposit[tokenWithDeposits[i]]
             );
             delete token_deposit[tokenWithDeposits[i]];
+            delete token_depositIndex[tokenWithDeposits[i]];
         }
 
         delete tokenWithDeposits;
         emit CashedOut(msg.sender);
     }
 
+    function cashOut(
+        address[] calldata tokens,
+        uint256[] calldata amounts,
+        bool deferred
+    ) external onlyOwner {
+        require(
+            tokens.length == amounts.length,
+            "Tokens and amounts length mismatch"
+        );
+
+        for (uint256 i = 0; i < tokens.length; i++) {
+            address token = tokens[i];
+            uint256 amount = amounts[i];
+            require(amount > 0, "Amount must be more than 0 tokens");
+            require(
+                amount <= token_deposit[token],
+                "Amount must be lower than deposit"
+            );
+
+            token_deposit[token] -= amount;
+            if (token_deposit[token] == 0) removeTokenDeposit(token);
+
+            if (deferred) token_owed[token] += amount;
+            else IERC20(token).transfer(owner(), amount);
+        }
+
+        emit CashedOut(msg.sender);
+    }
+
+    function withdrawTreasury(address token) external onlyOwner {
+        uint256 amount = token_owed[token];
+        require(amount > 0, "Nothing to withdraw");
+
+        delete token_owed[token];
+        IERC20(token).transfer(owner(), amount);
+        emit WithdrewTreasury(msg.sender, token, amount);
+    }
+
     function sell(uint256 amount, address exchangeToken) public virtual {
+        _sell(amount, 0, exchangeToken);
+    }
+
+    // Takes the whole amount from the seller and pays out only
+    // amount - amountKept; the kept part goes back to buyableTokens.
+    function _sell(
+        uint256 amount,
+        uint256 amountKept,
+        address exchangeToken
+    ) internal {
         require(isTokenAllowed(exchangeToken), "Cannot sell to this token");
-        require(amount > 0, "Amount must be more than 0 tokens");
+        require(amount > amountKept, "Amount must be more than 0 tokens");
+        uint256 amountSold = amount - amountKept;
 
-        uint256 valueSold = getValueFromToken(amount, address(this));
-        uint256 tokensToSend = getTokenFromValue(valueSold, exchangeToken);
+        (, uint256 tokensToSend) = _getTokenFromToken(
+            amountSold,
+            address(this),
+            exchangeToken
+        );
         uint256 sendableTokens = token_deposit[exchangeToken];
         require(
             tokensToSend <= sendableTokens,
@@ -83,7 +166,13 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
         _transfer(msg.sender, address(this), amount);
         IERC20(exchangeToken).transfer(msg.sender, tokensToSend);
 
-        emit Sold(msg.sender, amount, exchangeToken, tokensToSend);
+        emit Sold(
+            msg.sender,
+            amountSold,
+            amountKept,
+            exchangeToken,
+            tokensToSend
+        );
     }
 
     function fillUp(uint256 amount, address token) public {
@@ -97,7 +186,7 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
             buyableTokens += amount;
             _transfer(msg.sender, address(this), amount);
         } else {
-            if (token_deposit[token] == 0) tokenWithDeposits.push(token);
+            if (token_deposit[token] == 0) addTokenDeposit(token);
             token_deposit[token] += amount;
             IERC20(token).transferFrom(msg.sender, address(this), amount);
         }
@@ -105,15 +194,49 @@ abstract contract Tradable is ERC20, ITradable, AllowTokens, TokenValue {
         emit FilledUp(amount, token);
     }
 
+    function fillUpWithPermit(
+        uint256 amount,
+        address token,
+        uint256 deadline,
+        uint8 v,
+        bytes32 r,
+        bytes32 s
+    ) external {
+        PermitHelper.tryPermit(
+            token,
+            msg.sender,
+            address(this),
+            amount,
+            deadline,
+            v,
+            r,
+            s
+        );
+        fillUp(amount, token);
+    }
+
+    // Called by buy once the oracle value of the payment is known
+    function _beforeBuy(
+        uint256 amount,
+        address exchangeToken,
+        uint256 value
+    ) internal virtual {}
+
+    function addTokenDeposit(address token) internal {
+        if (token_depositIndex[token] > 0) return;
+
+        tokenWithDeposits.push(token);
+        token_depositIndex[token] = tokenWithDeposits.length;
+    }
+
     function removeTokenDeposit(address token) internal {
-        for (uint256 i = 0; i < tokenWithDeposits.length; i++) {
-            if (tokenWithDeposits[i] == token) {
-                tokenWithDeposits[i] = tokenWithDeposits[
-                    tokenWithDeposits.length - 1
-                ];
-                tokenWithDeposits.pop();
-                break;
-            }
-        }
+        uint256 tokenIndex = token_depositIndex[token];
+        if (tokenIndex == 0) return;
+
+        address lastToken = tokenWithDeposits[tokenWithDeposits.length - 1];
+        tokenWithDeposits[tokenIndex - 1] = lastToken;
+        token_depositIndex[lastToken] = tokenIndex;
+        tokenWithDeposits.pop();
+        delete token_depositIndex[token];
     }
 }
@@ -6,6 +6,8 @@ interface ITokenValue {
 
     function removeTokenPriceFeed(address token) external;
 
+    function setTokenHeartbeat(address token, uint256 heartbeat) external;
+
     function getValueFromToken(uint256 amount, address token)
         external
         view
@@ -16,6 +18,12 @@ interface ITokenValue {
         view
         returns (uint256);
 
+    function getTokenFromToken(
+        uint256 amount,
+        address fromToken,
+        address toToken
+    ) external view returns (uint256);
+
     function getTokenValue(address token)
         external
         view
@@ -4,9 +4,35 @@ pragma solidity ^0.8.0;
 interface ITradable {
     function buy(uint256 amount, address exchangeToken) external;
 
+    function buyWithPermit(
+        uint256 amount,
+        address exchangeToken,
+        uint256 deadline,
+        uint8 v,
+        bytes32 r,
+        bytes32 s
+    ) external;
+
     function cashOut() external;
 
+    function cashOut(
+        address[] calldata tokens,
+        uint256[] calldata amounts,
+        bool deferred
+    ) external;
+
+    function withdrawTreasury(address token) external;
+
     function sell(uint256 amount, address exchangeToken) external;
 
     function fillUp(uint256 amount, address token) external;
+
+    function fillUpWithPermit(
+        uint256 amount,
+        address token,
+        uint256 deadline,
+        uint8 v,
+        bytes32 r,
+        bytes32 s
+    ) external;
 }
@@ -5,5 +5,8 @@ metadata_template = {
     "attributes": [
         {"trait_type": "Luogo", "value": ""},
         {"trait_type": "Tipo di affitto", "value": ""},
+        {"trait_type": "Prezzo per quota", "display_type": "number", "value": 0},
+        {"trait_type": "APR", "display_type": "boost_percentage", "value": 0},
+        {"trait_type": "Quote totali", "display_type": "number", "value": 0},
     ]
 }
@@ -1,66 +1,93 @@
+import copy
+import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse
 from brownie import config
-from scripts.utilities import get_breed, is_local_blockchain
+from scripts.utilities import MockContract, get_contract
 from scripts.upload_to_ipfs import (
+    file_sha256,
+    upload_directory,
+    upload_dry_run,
     upload_with_local_IPFS_node,
     upload_with_pinata,
     UploadType,
 )
-from brownie import CoincreteAsset, network
+from brownie import CoincreteAsset, chain, network
 from metadata.metadata_template import metadata_template
 
-# todo clean up
-
-DESC_EXCLAMATIONS = [
-    "Such a good boy!",
-    "Much wow!",
-    "Goood boy!",
-    "Squirrel?",
-    "Wooof!",
-    "Uh a mailman!",
-    "Back to my tail...",
-    "Bau bau!",
-    "Wof woooof!",
-    "Any treat for me?",
-]
-
-BASE_ATTRIBUTE = [
-    "Smart",
-    "Playful",
-    "Fast",
-    "Fabulous",
-    "Funny",
-    "Adorable",
-    "Strong",
-    "Sneaky",
-    "Hungry",
-    "Sweet",
-]
+METADATA_FOLDER = "tokens"  # pinned as a single directory with pin_directory
+MANIFEST_FILE = "./metadata/{}/manifest.json"
+MULTICALL_CHUNK_SIZE = 500  # reads per eth_call
+BPS = 10000
 
 
 def create_metadata():
     ac = CoincreteAsset[-1]
-    n_token = ac.tokenCounter()
-    print(f"You have created {n_token} NFT on contract {ac.address}\n")
+    tokens_data = get_tokens_data(ac)
+    print(f"Found {len(tokens_data)} tokens on contract {ac.address}\n")
+    check_unique_names(tokens_data)
 
-    NFTs_metadata_URI = {}
     URI_file_name = f"./metadata/{network.show_active()}/URIs.json"
+    manifest = load_manifest()
+    upload_type = config["ipfs"]["upload_type"]
+    pin_directory = config["ipfs"].get("pin_directory", False)
+    folder = f"./metadata/{network.show_active()}/{METADATA_FOLDER}"
+    Path(f"./metadata/{network.show_active()}").mkdir(parents=True, exist_ok=True)
+    if pin_directory:
+        Path(folder).mkdir(exist_ok=True)
 
-    for token_id in range(n_token):
-        breed = get_breed(ac.tokenId_Dog(token_id)[0])
-        md_file_name = f"./metadata/{network.show_active()}/{token_id}-{breed}.json"
+    to_create = {}
+    for token_id, data in tokens_data.items():
+        # same file name CoincreteAsset.uri appends to its prefix
+        if pin_directory:
+            md_file_name = f"{folder}/{get_token_file_name(data)}"
+        else:
+            md_file_name = (
+                f"./metadata/{network.show_active()}/{get_token_file_name(data)}"
+            )
 
-        if config["ipfs"]["overwrite_metadata"] or not Path(md_file_name).exists():
-            uri = create_NFT_metadata(md_file_name, ac.tokenId_Dog(token_id))
-            NFTs_metadata_URI[str(token_id)] = uri
+        if config["ipfs"]["overwrite_metadata"] or is_changed(
+            manifest["tokens"].get(str(token_id)), md_file_name, data, upload_type
+        ):
+            to_create[token_id] = (md_file_name, data)
 
         else:
-            print(f"File {md_file_name} already exists. Delete it to overwrite it")
-            print("Check brownie-config > ipfs > overwrite_metadata\n")
+            print(f"Token {token_id} unchanged, skipping {md_file_name}")
+
+    NFTs_metadata_URI = create_NFTs_metadata(to_create, upload=not pin_directory)
+
+    for token_id, (md_file_name, data) in to_create.items():
+        manifest["tokens"][str(token_id)] = {
+            "data": fingerprint(data),
+            "metadata": file_sha256(md_file_name),
+            "uri": NFTs_metadata_URI[str(token_id)],
+            "upload_type": upload_type,
+        }
 
-    if NFTs_metadata_URI is not {}:
+    if pin_directory:
+        # one pin for the whole folder: every token URI moves to the new CID
+        # a dry_run CID was never pinned: upload again with a real upload type
+        if to_create or manifest.get("directory_upload_type") != upload_type:
+            # only the current files: renamed tokens leave their old file behind
+            filepaths = [
+                f"{folder}/{get_token_file_name(data)}" for data in tokens_data.values()
+            ]
+            manifest["directory"] = upload_directory(folder, filepaths)
+            manifest["directory_upload_type"] = upload_type
+        directory_cid = manifest["directory"]
+        NFTs_metadata_URI = {
+            str(token_id): f"ipfs://{directory_cid}/{get_token_file_name(data)}"
+            for token_id, data in tokens_data.items()
+        }
+        with open(URI_file_name, "w") as fp:
+            json.dump(NFTs_metadata_URI, fp)
+        for token_id, uri in NFTs_metadata_URI.items():
+            if token_id in manifest["tokens"]:
+                manifest["tokens"][token_id]["uri"] = uri
+
+    elif NFTs_metadata_URI:
         if config["ipfs"]["overwrite_metadata"]:
             # save URI on file
             with open(URI_file_name, "w") as fp:
@@ -78,45 +105,194 @@ def create_metadata():
             print(NFTs_metadata_URI)
 
             updated_NFTs_URI = previous_NFTs_URI | NFTs_metadata_URI
+            updated_NFTs_URI = dict(
+                sorted(updated_NFTs_URI.items(), key=lambda item: int(item[0]))
+            )
             with open(f"./metadata/{network.show_active()}/URIs.json", "w") as fp:
                 json.dump(updated_NFTs_URI, fp)
 
+    save_manifest(manifest)
+
+
+def get_tokens_data(asset):
+    """
+    Reads tokenID_data of every token in the catalog, batching the calls
+    through Multicall and pinning them to the same block.
+
+    Returns:
+        dict: token ID -> (name, pricePerUnit, APR, currentAmount, maxAmount)
+    """
+    block = chain.height
+    n_token = asset.catalogLength(block_identifier=block)
+    token_ids = multicall_read(
+        asset, "catalogTokenIDs", [(i,) for i in range(n_token)], block
+    )
+    tokens_data = multicall_read(
+        asset, "tokenID_data", [(token_id,) for token_id in token_ids], block
+    )
+    return dict(zip(token_ids, tokens_data))
+
+
+def multicall_read(contract, method_name, args_list, block_identifier=None):
+    """
+    Calls a view method once for each entry of args_list, with
+    MULTICALL_CHUNK_SIZE calls per eth_call.
+
+    Returns:
+        list: decoded results, in the same order as args_list
+    """
+    multicall = get_contract(MockContract.MULTICALL)
+    method = getattr(contract, method_name)
+
+    results = []
+    for start in range(0, len(args_list), MULTICALL_CHUNK_SIZE):
+        calls = [
+            (contract.address, method.encode_input(*args))
+            for args in args_list[start : start + MULTICALL_CHUNK_SIZE]
+        ]
+        _, return_data = multicall.aggregate.call(
+            calls, block_identifier=block_identifier
+        )
+        results += [method.decode_output(data) for data in return_data]
+
+    return results
+
+
+def get_name(data):
+    return bytes(data[0]).rstrip(b"\0").decode()
+
+
+def check_unique_names(tokens_data):
+    """
+    Metadata and image files are named after the token name: tokens sharing
+    a name would overwrite each other's metadata.
+    """
+    token_ids = {}
+    for token_id, data in tokens_data.items():
+        token_ids.setdefault(get_name(data), []).append(token_id)
+    duplicates = {name: ids for name, ids in token_ids.items() if len(ids) > 1}
+    if duplicates:
+        raise ValueError(f"Tokens sharing a name: {duplicates}")
+
+
+def load_manifest():
+    """
+    The manifest keeps, for each token, the fingerprints of the on-chain data
+    and of the metadata file it was rendered to, and the upload type its URI
+    comes from, so unchanged tokens are skipped.
+    """
+    manifest_file = MANIFEST_FILE.format(network.show_active())
+    if Path(manifest_file).exists():
+        with open(manifest_file) as fp:
+            return json.load(fp)
+    return {"tokens": {}}
+
+
+def save_manifest(manifest):
+    with open(MANIFEST_FILE.format(network.show_active()), "w") as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
 
-def get_image_from(breed):
-    return "./img/" + breed.lower().replace("_", "-") + ".png"
 
+def fingerprint(data):
+    # only the fields rendered into the metadata: currentAmount moves with every sale
+    name, price_per_unit, APR, _, max_amount = data
+    rendered = [name, price_per_unit, APR, max_amount]
+    encoded = json.dumps(rendered, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
 
-def create_NFT_metadata(md_file_name, data):
+
+def is_changed(manifest_entry, md_file_name, data, upload_type):
+    return (
+        manifest_entry is None
+        or manifest_entry.get("upload_type") != upload_type
+        or not Path(md_file_name).exists()
+        or manifest_entry["data"] != fingerprint(data)
+        or manifest_entry["metadata"] != file_sha256(md_file_name)
+    )
+
+
+def get_token_file_name(data):
+    # CoincreteAsset.uri is its URI prefix + name + ".json": with the prefix
+    # set to ipfs://<directory CID>/ it resolves to the pinned file
+    return f"{get_name(data)}.json"
+
+
+def create_NFTs_metadata(to_create, upload=True):
+    """
+    Uploads images and metadata of the given tokens on a bounded thread pool.
+
+    Args:
+        to_create (dict): token ID -> (metadata file name, token data)
+        upload (bool): upload each metadata file, or only write it to disk
+
+    Returns:
+        dict: token ID (str) -> metadata URI (None if not uploaded),
+        ordered by token ID
+    """
+    concurrency = config["ipfs"].get("concurrency", 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # every image is submitted before any metadata task, so a metadata
+        # task never waits on an image upload that has no worker yet
+        image_uris = {}
+        for _, data in to_create.values():
+            image_path = get_image_from(get_name(data))
+            if image_path not in image_uris:
+                image_uris[image_path] = executor.submit(upload_file, image_path)
+
+        metadata_uris = {
+            token_id: executor.submit(
+                create_NFT_metadata,
+                md_file_name,
+                data,
+                image_uris[get_image_from(get_name(data))],
+                upload,
+            )
+            for token_id, (md_file_name, data) in sorted(to_create.items())
+        }
+
+        return {
+            str(token_id): future.result() for token_id, future in metadata_uris.items()
+        }
+
+
+def upload_file(filepath):
+    if config["ipfs"]["upload_type"] == UploadType.PINATA.value:
+        return upload_with_pinata(filepath)
+    if config["ipfs"]["upload_type"] == UploadType.DRY_RUN.value:
+        return upload_dry_run(filepath)
+    return upload_with_local_IPFS_node(filepath)
+
+
+def get_image_from(name):
+    return f"./img/{name}.png"
+
+
+def create_NFT_metadata(md_file_name, data, image_upload, upload=True):
     print(f"Creating {md_file_name}")
 
-    NFT_metadata = metadata_template
+    NFT_metadata = copy.deepcopy(metadata_template)
+
+    _, price_per_unit, APR, _, max_amount = data
+    price = price_per_unit / 10**18
+    apr_percent = APR * 100 / BPS
 
-    NFT_metadata["name"] = get_breed(data[0]).replace("_", " ").capitalize()
+    NFT_metadata["name"] = get_name(data)
     NFT_metadata["description"] = (
-        f"A beautiful {NFT_metadata['name']} pup. " + DESC_EXCLAMATIONS[data[2]]
+        f"{NFT_metadata['name']}: {max_amount} quote da {price:g}$ "
+        f"con un rendimento annuo del {apr_percent:g}%"
     )
 
-    NFT_metadata["attributes"][0]["value"] = BASE_ATTRIBUTE[data[1]]
-    NFT_metadata["attributes"][1]["value"] = data[3]
-    NFT_metadata["attributes"][2]["value"] = data[4]
-    image_path = get_image_from(get_breed(data[0]))
-    image_uri = (
-        upload_with_pinata(image_path)
-        if config["ipfs"]["upload_type"] == UploadType.PINATA.value
-        else upload_with_local_IPFS_node(image_path)
-    )
-    NFT_metadata["image"] = image_uri
+    NFT_metadata["attributes"][2]["value"] = price
+    NFT_metadata["attributes"][3]["value"] = apr_percent
+    NFT_metadata["attributes"][4]["value"] = max_amount
+    NFT_metadata["image"] = image_upload.result()
 
     # save metadata on file
     with open(md_file_name, "w") as fp:
         json.dump(NFT_metadata, fp)
 
-    if config["ipfs"]["upload_type"] == UploadType.PINATA.value:
-        metadata_URI = upload_with_pinata(md_file_name)
-    else:
-        metadata_URI = upload_with_local_IPFS_node(md_file_name)
-
-    return metadata_URI
+    if upload:
+        return upload_file(md_file_name)
 
 
 def get_hash(file_URI):
@@ -124,7 +300,4 @@ def get_hash(file_URI):
 
 
 def main():
-    if is_local_blockchain():
-        print("\n!!!Run me on the rinkeby network!!!\n")
-        return
     create_metadata()
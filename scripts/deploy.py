@@ -17,6 +17,10 @@ def publish_source_policy():
     return config["networks"][network.show_active()].get("verify", False)
 
 
+def price_feed_heartbeat():
+    return config["networks"][network.show_active()].get("price_feed_heartbeat", 0)
+
+
 def deploy():
     account = get_account()
 
@@ -47,6 +51,10 @@ def add_allowed_tokens(contract, allowed_tokens_price_feeds, account):
         contract.setTokenPriceFeed(
             token.address, allowed_tokens_price_feeds[token], {"from": account}
         )
+        if price_feed_heartbeat():
+            contract.setTokenHeartbeat(
+                token.address, price_feed_heartbeat(), {"from": account}
+            )
 
     return contract
 
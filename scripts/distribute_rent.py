@@ -0,0 +1,267 @@
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from eth_hash.auto import keccak
+from brownie import BrickToken, CoincreteAsset, RentDistributor, network, web3
+from scripts.utilities import get_account
+
+BPS = 10000
+YEAR = 365 * 24 * 60 * 60
+LOGS_BLOCK_RANGE = 5000  # blocks per eth_getLogs request
+HASH_BATCH = 1 << 16  # nodes hashed per worker task
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+def get_held_unit_seconds(asset, from_block, to_block):
+    """
+    Replays the TransferSingle and TransferBatch logs of the asset contract up to
+    to_block, integrating every balance over the period after from_block.
+
+    Balances after the logs of from_block start the period, so a unit bought
+    just before to_block earns only the seconds it was held.
+
+    Returns:
+        dict: {holder: {token_id: units held * seconds}}
+    """
+    events = web3.eth.contract(address=asset.address, abi=asset.abi).events
+    from_time = web3.eth.get_block(from_block).timestamp
+    to_time = web3.eth.get_block(to_block).timestamp
+    block_times = {}
+
+    balances = {}  # (holder, token_id) -> balance
+    changed_at = {}  # (holder, token_id) -> time of the last balance change
+    held = {}
+
+    def move(holder, token_id, value, time):
+        if holder == ZERO_ADDRESS:
+            return
+        key = (holder, token_id)
+        since = changed_at.get(key, from_time)
+        held[key] = held.get(key, 0) + balances.get(key, 0) * (time - since)
+        changed_at[key] = time
+        balances[key] = balances.get(key, 0) + value
+
+    def log_time(log):
+        # only transfers inside the period need the time of their block
+        if log["blockNumber"] <= from_block:
+            return from_time
+        if log["blockNumber"] not in block_times:
+            block = web3.eth.get_block(log["blockNumber"])
+            block_times[log["blockNumber"]] = block.timestamp
+        return block_times[log["blockNumber"]]
+
+    for start in range(0, to_block + 1, LOGS_BLOCK_RANGE):
+        end = min(start + LOGS_BLOCK_RANGE - 1, to_block)
+        logs = sorted(
+            events.TransferSingle.getLogs(fromBlock=start, toBlock=end)
+            + events.TransferBatch.getLogs(fromBlock=start, toBlock=end),
+            key=lambda log: (log["blockNumber"], log["logIndex"]),
+        )
+        for log in logs:
+            args, time = log["args"], log_time(log)
+            if log["event"] == "TransferSingle":
+                transfers = [(args["id"], args["value"])]
+            else:
+                transfers = zip(args["ids"], args["values"])
+            for token_id, value in transfers:
+                move(args["from"], token_id, -value, time)
+                move(args["to"], token_id, value, time)
+
+    for holder, token_id in list(balances):
+        move(holder, token_id, 0, to_time)
+
+    held_by_holder = {}
+    for (holder, token_id), unit_seconds in held.items():
+        if unit_seconds > 0:
+            held_by_holder.setdefault(holder, {})[token_id] = unit_seconds
+    return held_by_holder
+
+
+def compute_rent(held, asset, brick_token, to_block):
+    """
+    Computes the BRICK owed to every holder for one rent period.
+
+    The rent of a unit is pricePerUnit * APR per second held, at the prices of
+    to_block, converted to BRICK with a single read of the BRICK price feed.
+    """
+    brick_price, brick_decimals = brick_token.getTokenValue(
+        brick_token, block_identifier=to_block
+    )
+    unit_rent = {}
+
+    amounts = {}
+    for holder, tokens in held.items():
+        value = 0
+        for token_id, unit_seconds in tokens.items():
+            if token_id not in unit_rent:
+                data = asset.tokenID_data(token_id, block_identifier=to_block)
+                unit_rent[token_id] = data[1] * data[2]
+            value += unit_seconds * unit_rent[token_id]
+
+        amount = value // (BPS * YEAR) * 10**brick_decimals // brick_price
+        if amount > 0:
+            amounts[holder] = amount
+
+    return amounts
+
+
+def encode_leaf(index, account, amount):
+    """
+    Same leaf as RentDistributor.claim: keccak256(abi.encode(index, account, amount))
+    """
+    encoded = (
+        index.to_bytes(32, "big")
+        + bytes.fromhex(account[2:]).rjust(32, b"\0")
+        + amount.to_bytes(32, "big")
+    )
+    return keccak(encoded)
+
+
+def _hash_leaves(entries):
+    start, batch = entries
+    return [
+        encode_leaf(start + i, account, amount)
+        for i, (account, amount) in enumerate(batch)
+    ]
+
+
+def _hash_pairs(nodes):
+    # sorted pairs, as expected by OpenZeppelin's MerkleProof
+    return [
+        keccak(a + b) if a < b else keccak(b + a)
+        for a, b in zip(nodes[::2], nodes[1::2])
+    ]
+
+
+def _batches(items, size):
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def build_tree(entries, workers=None):
+    """
+    Builds every level of the Merkle tree of (account, amount) entries.
+
+    Hashing is split in batches of HASH_BATCH nodes spread over a process pool,
+    so the time goes down with the cores available.
+
+    Returns:
+        list: levels of the tree, levels[0] are the leaves and levels[-1] = [root]
+    """
+    if len(entries) == 0:
+        raise ValueError("Cannot build a tree without leaves")
+
+    with Pool(workers) as pool:
+        leaf_batches = [
+            (start, entries[start : start + HASH_BATCH])
+            for start in range(0, len(entries), HASH_BATCH)
+        ]
+        leaves = [
+            leaf for batch in pool.map(_hash_leaves, leaf_batches) for leaf in batch
+        ]
+
+        levels = [leaves]
+        while len(levels[-1]) > 1:
+            level = levels[-1]
+            parents = [
+                parent
+                for batch in pool.map(_hash_pairs, _batches(level, HASH_BATCH))
+                for parent in batch
+            ]
+            if len(level) % 2 == 1:
+                parents.append(level[-1])  # odd node is promoted unchanged
+            levels.append(parents)
+
+    return levels
+
+
+def get_proof(levels, index):
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append("0x" + level[sibling].hex())
+        index //= 2
+    return proof
+
+
+def write_proofs(file_name, entries, levels):
+    """
+    Streams one JSON line per claim to file_name, ready for RentDistributor.claim.
+
+    Leaves are walked in order, so the sibling of level k only changes every 2**k
+    leaves and is hex encoded once per change instead of once per proof.
+    Every line carries its full proof, about 1.5KB for a million leaves: that
+    is a 1.5GB file.
+    """
+    depth = len(levels) - 1
+    path = [None] * depth
+    with open(file_name, "w") as fp:
+        for index, (account, amount) in enumerate(entries):
+            for k in range(depth):
+                if index & ((1 << k) - 1):
+                    break
+                sibling = (index >> k) ^ 1
+                path[k] = (
+                    '"0x' + levels[k][sibling].hex() + '"'
+                    if sibling < len(levels[k])
+                    else None
+                )
+            proof = ", ".join(node for node in path if node is not None)
+            fp.write(
+                f'{{"index": {index}, "account": "{account}", '
+                f'"amount": "{amount}", "proof": [{proof}]}}\n'
+            )
+
+
+def distribute_rent():
+    """
+    Pays the rent of the blocks since the previous period through a new
+    RentDistributor root. CoincreteAsset stops accruing rent on-chain at
+    startRentDistribution, where the first period starts, so no rent is paid
+    by both.
+    """
+    account = get_account()
+    asset = CoincreteAsset[-1]
+    brick_token = BrickToken[-1]
+    distributor = (
+        RentDistributor[-1]
+        if len(RentDistributor) > 0
+        else RentDistributor.deploy(brick_token, {"from": account})
+    )
+
+    if distributor.currentPeriod() > 0:
+        from_block = distributor.period_toBlock(distributor.currentPeriod())
+    else:
+        from_block = asset.rentDistributionStartBlock()
+        if from_block == 0:
+            raise ValueError("Call CoincreteAsset.startRentDistribution first")
+    to_block = web3.eth.block_number
+
+    start = time.time()
+    held = get_held_unit_seconds(asset, from_block, to_block)
+    amounts = compute_rent(held, asset, brick_token, to_block)
+    entries = sorted(amounts.items())
+    print(f"Computed rent for {len(entries)} holders in {time.time() - start:.1f}s")
+
+    start = time.time()
+    levels = build_tree(entries)
+    root = "0x" + levels[-1][0].hex()
+    print(f"Built Merkle tree with root {root} in {time.time() - start:.1f}s")
+
+    period = distributor.currentPeriod() + 1
+    out_dir = Path(f"./distributions/{network.show_active()}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    proofs_file = out_dir / f"period-{period}.jsonl"
+    write_proofs(proofs_file, entries, levels)
+    print(f"Proofs written to {proofs_file}")
+
+    total = sum(amounts.values())
+    brick_token.releaseAprBrick(distributor, total, {"from": account})
+    distributor.setDistributionRoot(root, to_block, {"from": account})
+    print(f"Period {period} (blocks {from_block + 1}-{to_block}): {total} BRICK")
+
+    return root
+
+
+def main():
+    distribute_rent()
@@ -1,54 +1,674 @@
+import base64
+import functools
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import urlsplit
 import requests
-from brownie import config
+from requests.adapters import HTTPAdapter
+from brownie import config, network
 from enum import Enum
 
 
 class UploadType(Enum):
     IPFS = "ipfs"
     PINATA = "pinata"
+    DRY_RUN = "dry_run"
 
 
-def upload_with_local_IPFS_node(filepath):
+UPLOAD_CACHE_FILE = "./metadata/{}/upload_cache.jsonl"
+HASH_CHUNK_SIZE = 1 << 16
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+# `ipfs add` defaults: size-262144 chunker, balanced layout, 174 links per node
+CID_CHUNK_SIZE = 256 * 1024
+CID_MAX_LINKS = 174
+# kubo switches a directory to a HAMT shard once the names and CIDs of its
+# links reach 256KiB; only flat directories are built here
+DIRECTORY_SHARDING_SIZE = 256 * 1024
+CODEC_RAW = 0x55
+CODEC_DAG_PB = 0x70
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+_cache_lock = threading.Lock()
+_cache = {}  # cache file -> {(upload type, sha256): CID}
+
+
+class RateLimiter:
+    """
+    Token bucket: allows bursts of `burst` requests, then `rate` per second.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Uploader:
+    """
+    Shared HTTP client for IPFS uploads: pooled keep-alive connections,
+    timeouts, rate limiting and retries with exponential backoff and jitter.
+    Each host gets its own rate limit; requests to a local node can skip it.
+    """
+
+    def __init__(
+        self,
+        rate=3,
+        burst=10,
+        pool_size=10,
+        timeout=(5, 120),
+        max_retries=5,
+        backoff=1,
+        max_backoff=60,
+    ):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.rate = rate
+        self.burst = burst
+        self._limiters = {}  # host -> RateLimiter
+        self._limiters_lock = threading.Lock()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def post(self, url, rate_limited=True, **kwargs):
+        limiter = self._limiter(url) if rate_limited else None
+        for attempt in range(self.max_retries + 1):
+            if limiter is not None:
+                limiter.acquire()
+            if attempt > 0 and hasattr(kwargs.get("data"), "seek"):
+                kwargs["data"].seek(0)  # resend a streamed body from the start
+            try:
+                response = self.session.post(url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"{url}: {e.__class__.__name__}, retrying in {delay:.1f}s")
+            else:
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt == self.max_retries
+                ):
+                    response.raise_for_status()
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                print(f"{url}: HTTP {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        with self._limiters_lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.rate, self.burst)
+            return self._limiters[host]
+
+    def _backoff_delay(self, attempt):
+        # full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def _retry_after(self, response):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(
+                0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()
+            )
+        except (TypeError, ValueError):
+            return None
+
+
+class MultipartFileStream:
+    """
+    multipart/form-data body read from disk in chunks while it is sent,
+    so memory use does not depend on the size of the files.
+
+    Args:
+        filepath (str, optional): single file to send in the `field` field
+        field (str): form field name of `filepath`
+        progress (callable, optional): called as progress(bytes_sent, total_bytes)
+        files (list, optional): (field, filename, filepath) of each file to send
+        fields (dict, optional): extra text fields
+    """
+
+    def __init__(
+        self, filepath=None, field="file", progress=None, files=(), fields=None
+    ):
+        if fields is None:
+            fields = {}
+        if filepath is not None:
+            files = [(field, os.path.basename(filepath), filepath)]
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        # bytes are sent as they are, str parts are paths of files to stream
+        self._parts = []
+        for name, value in fields.items():
+            self._parts.append(
+                (
+                    f"--{boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                    f"{value}\r\n"
+                ).encode()
+            )
+        for name, filename, path in files:
+            self._parts.append(
+                (
+                    f"--{boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{name}"; '
+                    f'filename="{filename}"\r\n'
+                    "Content-Type: application/octet-stream\r\n\r\n"
+                ).encode()
+            )
+            self._parts.append(str(path))
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{boundary}--\r\n".encode())
+
+        self._length = sum(
+            len(part) if isinstance(part, bytes) else os.path.getsize(part)
+            for part in self._parts
+        )
+        self._progress = progress
+        self._fp = None
+        self.seek(0)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter(lambda: self.read(UPLOAD_CHUNK_SIZE), b"")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def seek(self, position):
+        if position != 0:
+            raise ValueError("Can only rewind to the start")
+        self.close()
+        self._part = 0
+        self._offset = 0
+        self._sent = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length - self._sent
+
+        chunks = []
+        while size > 0 and self._part < len(self._parts):
+            part = self._parts[self._part]
+            if isinstance(part, bytes):
+                chunk = part[self._offset : self._offset + size]
+                self._offset += len(chunk)
+            else:
+                if self._fp is None:
+                    self._fp = open(part, "rb")
+                chunk = self._fp.read(size)
+            if not chunk:
+                self.close()
+                self._part += 1
+                self._offset = 0
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        data = b"".join(chunks)
+        self._sent += len(data)
+        if data and self._progress:
+            self._progress(self._sent, self._length)
+        return data
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def get_uploader():
+    """
+    Returns the uploader shared by every upload, sized from brownie-config > ipfs.
+    """
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            ipfs_config = config["ipfs"]
+            _uploader = Uploader(
+                rate=ipfs_config.get("requests_per_second", 3),
+                burst=ipfs_config.get("requests_burst", 10),
+                pool_size=ipfs_config.get("concurrency", 1),
+                timeout=(5, ipfs_config.get("timeout", 120)),
+                max_retries=ipfs_config.get("max_retries", 5),
+            )
+        return _uploader
+
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with Path(filepath).open("rb") as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_cache(cache_file):
+    if cache_file not in _cache:
+        entries = {}
+        if Path(cache_file).exists():
+            with open(cache_file) as fp:
+                for line in fp:
+                    if line.strip():
+                        entry = json.loads(line)
+                        entries[(entry["type"], entry["sha256"])] = entry["cid"]
+        _cache[cache_file] = entries
+    return _cache[cache_file]
+
+
+def get_cached_cid(upload_type, sha256):
+    cache_file = UPLOAD_CACHE_FILE.format(network.show_active())
+    with _cache_lock:
+        return _load_cache(cache_file).get((upload_type.value, sha256))
+
+
+def cache_cid(upload_type, sha256, cid):
+    cache_file = UPLOAD_CACHE_FILE.format(network.show_active())
+    with _cache_lock:
+        _load_cache(cache_file)[(upload_type.value, sha256)] = cid
+        Path(cache_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "a") as fp:
+            entry = {"type": upload_type.value, "sha256": sha256, "cid": cid}
+            fp.write(json.dumps(entry) + "\n")
+
+
+def _varint(n):
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _pb_varint(field, n):
+    return _varint(field << 3) + _varint(n)
+
+
+def _pb_bytes(field, data):
+    return _varint(field << 3 | 2) + _varint(len(data)) + data
+
+
+def _base58(data):
+    n = int.from_bytes(data, "big")
+    out = ""
+    while n > 0:
+        n, r = divmod(n, 58)
+        out = BASE58_ALPHABET[r] + out
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + out
+
+
+def _cid_bytes(block, codec, cid_version):
+    multihash = b"\x12\x20" + hashlib.sha256(block).digest()  # sha2-256
+    if cid_version == 0:
+        return multihash
+    return _varint(1) + _varint(codec) + multihash
+
+
+def _unixfs_file(data=b"", blocksizes=()):
+    unixfs = _pb_varint(1, 2)  # Type: File
+    if data:
+        unixfs += _pb_bytes(2, data)
+    unixfs += _pb_varint(3, len(data) + sum(blocksizes))  # filesize
+    for blocksize in blocksizes:
+        unixfs += _pb_varint(4, blocksize)
+    return unixfs
+
+
+def _dag_pb_node(unixfs, links=()):
+    node = b""
+    for cid, tsize, name in links:
+        link = _pb_bytes(1, cid) + _pb_bytes(2, name) + _pb_varint(3, tsize)
+        node += _pb_bytes(2, link)
+    return node + _pb_bytes(1, unixfs)
+
+
+def _cid_string(cid, cid_version):
+    if cid_version == 0:
+        return _base58(cid)
+    return "b" + base64.b32encode(cid).decode().lower().rstrip("=")
+
+
+def _file_dag(filepath, cid_version, blocks=None):
+    """
+    Builds the UnixFS DAG of a file like `ipfs add` does.
+
+    Args:
+        blocks (list, optional): collects (CID bytes, block bytes) of every node
+
+    Returns:
+        tuple: (root CID bytes, cumulative DAG size, file size)
+    """
+
+    def leaf(chunk):
+        if cid_version == 1:
+            cid, block = _cid_bytes(chunk, CODEC_RAW, 1), chunk
+        else:
+            block = _dag_pb_node(_unixfs_file(chunk))
+            cid = _cid_bytes(block, CODEC_DAG_PB, 0)
+        if blocks is not None:
+            blocks.append((cid, block))
+        return cid, len(block), len(chunk)
+
+    def internal(children):
+        unixfs = _unixfs_file(blocksizes=[child[2] for child in children])
+        block = _dag_pb_node(unixfs, [(c[0], c[1], b"") for c in children])
+        cid = _cid_bytes(block, CODEC_DAG_PB, cid_version)
+        if blocks is not None:
+            blocks.append((cid, block))
+        return (
+            cid,
+            len(block) + sum(child[1] for child in children),
+            sum(child[2] for child in children),
+        )
+
+    with Path(filepath).open("rb") as fp:
+        chunks = iter(lambda: fp.read(CID_CHUNK_SIZE), b"")
+        pending = None
+
+        def fill(children, depth):
+            # same recursion as go-unixfs balanced layout fillNodeRec
+            nonlocal pending
+            while len(children) < CID_MAX_LINKS and pending is not None:
+                if depth == 1:
+                    children.append(leaf(pending))
+                    pending = next(chunks, None)
+                else:
+                    children.append(fill([], depth - 1))
+            return internal(children)
+
+        root = leaf(next(chunks, b""))
+        pending = next(chunks, None)
+        depth = 1
+        while pending is not None:
+            root = fill([root], depth)
+            depth += 1
+
+    return root
+
+
+def _directory_dag(filepaths, cid_version, blocks=None):
+    """
+    Builds a flat UnixFS directory holding the given files, like
+    `ipfs add -r` on a folder that contains only them.
+    Raises ValueError for folders large enough to be sharded by IPFS, whose
+    CID would not match.
+    """
+    links = sorted(
+        (os.path.basename(path).encode(), _file_dag(path, cid_version, blocks))
+        for path in filepaths
+    )
+    estimated_size = sum(len(name) + len(cid) for name, (cid, _, _) in links)
+    if estimated_size >= DIRECTORY_SHARDING_SIZE:
+        raise ValueError(
+            f"{len(links)} files would make IPFS shard the directory: "
+            "split them in smaller folders"
+        )
+    block = _dag_pb_node(
+        _pb_varint(1, 1),  # Type: Directory
+        [(cid, tsize, name) for name, (cid, tsize, _) in links],
+    )
+    cid = _cid_bytes(block, CODEC_DAG_PB, cid_version)
+    if blocks is not None:
+        blocks.append((cid, block))
+    return cid
+
+
+def compute_cid(filepath, cid_version=0):
+    """
+    Computes offline the CID `ipfs add` gives to a file with default settings
+    (`--cid-version=1` also implies `--raw-leaves`).
+
+    Returns:
+        str: base58btc CIDv0 or base32 CIDv1
+    """
+    return _cid_string(_file_dag(filepath, cid_version)[0], cid_version)
+
+
+def compute_directory_cid(filepaths, cid_version=0):
+    """
+    Computes offline the CID of a folder holding the given files.
+    """
+    return _cid_string(_directory_dag(filepaths, cid_version), cid_version)
+
+
+def write_car(filepaths, car_path, cid_version=0):
+    """
+    Writes a CARv1 file with the directory DAG of the given files, to be
+    imported by an IPFS node with `ipfs dag import`.
+    Blocks are held in memory, so it is meant for metadata folders.
+
+    Returns:
+        str: CID of the directory
+    """
+    blocks = []
+    root = _directory_dag(filepaths, cid_version, blocks)
+
+    # DAG-CBOR {"roots": [CID(root)], "version": 1}
+    cid_bytes = b"\x00" + root
+    header = (
+        b"\xa2\x65roots\x81\xd8\x2a"
+        + b"\x58"
+        + bytes([len(cid_bytes)])
+        + cid_bytes
+        + b"\x67version\x01"
+    )
+
+    written = set()
+    with open(car_path, "wb") as fp:
+        fp.write(_varint(len(header)) + header)
+        for cid, block in blocks:
+            if cid in written:
+                continue
+            written.add(cid)
+            fp.write(_varint(len(cid) + len(block)) + cid + block)
+
+    return _cid_string(root, cid_version)
+
+
+def ipfs_uri(ipfs_hash, filename):
+    return f"https://ipfs.io/ipfs/{ipfs_hash}?filename={filename}"
+
+
+def cached_upload(upload_type):
+    """
+    Skips the upload when a file with the same SHA-256 was already pinned
+    with this upload type on the active network.
+    The wrapped function pins the file and returns its CID.
+    """
+
+    def decorator(pin):
+        @functools.wraps(pin)
+        def upload(filepath, progress=None):
+            filename = filepath.split("/")[-1]
+            sha256 = file_sha256(filepath)
+            ipfs_hash = get_cached_cid(upload_type, sha256)
+            if ipfs_hash is None:
+                ipfs_hash = pin(filepath, progress)
+                cache_cid(upload_type, sha256, ipfs_hash)
+                cached = ""
+            else:
+                cached = " (cached)"
+
+            file_uri = ipfs_uri(ipfs_hash, filename)
+            print(f"{filename}: {file_uri}{cached}")
+            return file_uri
+
+        return upload
+
+    return decorator
+
+
+@cached_upload(UploadType.IPFS)
+def upload_with_local_IPFS_node(filepath, progress=None):
     """
     Needs to run the local IPFS node with command
     > ipfs daemon
     """
-    with Path(filepath).open("rb") as fp:  # open file in read mode as bytes
-        file_bin = fp.read()
-
+    with MultipartFileStream(filepath, progress=progress) as body:
         # info from https://docs.ipfs.io/reference/http/api/#api-v0-add
         ipfs_url = "http://127.0.0.1:5001"  # info from command > ipfs daemon
         endpoint = "/api/v0/add"
 
-        response = requests.post(ipfs_url + endpoint, files={"file": file_bin})
+        response = get_uploader().post(
+            ipfs_url + endpoint,
+            rate_limited=False,  # the local node has no request quota
+            headers={"Content-Type": body.content_type},
+            data=body,
+        )
+
+        return response.json()["Hash"]
 
-        ipfs_hash = response.json()["Hash"]
-        filename = filepath.split("/")[-1]
-        file_uri = f"https://ipfs.io/ipfs/{ipfs_hash}?filename={filename}"
 
-        print(f"{filename}: {file_uri}")
-        return file_uri
+@cached_upload(UploadType.PINATA)
+def upload_with_pinata(filepath, progress=None):
+    with MultipartFileStream(filepath, progress=progress) as body:
+        # info from https://docs.pinata.cloud/pinata-api/pinning/pin-file-or-directory
+        pinata_url = "https://api.pinata.cloud"
+        endpoint = "/pinning/pinFileToIPFS"
+        header = {
+            "Authorization": config["ipfs"]["pinata_jwm"],
+            "Content-Type": body.content_type,
+        }
+
+        response = get_uploader().post(
+            pinata_url + endpoint,
+            headers=header,
+            data=body,
+        )
 
+        return response.json()["IpfsHash"]
 
-def upload_with_pinata(filepath):
-    with Path(filepath).open("rb") as fp:  # open file in read mode as bytes
-        file_bin = fp.read()
 
+def upload_dry_run(filepath, progress=None):
+    """
+    Returns the URI the file would get on IPFS without any network call.
+    """
+    filename = filepath.split("/")[-1]
+    file_uri = ipfs_uri(compute_cid(filepath), filename)
+    print(f"{filename}: {file_uri} (dry run)")
+    return file_uri
+
+
+def upload_directory(folder, filepaths=None):
+    """
+    Pins the given files of `folder` (every file by default) as one IPFS
+    directory with a single request.
+    The local node and dry_run build the directory locally, so they only
+    support folders below DIRECTORY_SHARDING_SIZE (see _directory_dag).
+
+    Returns:
+        str: CID of the directory
+    """
+    if filepaths is None:
+        filepaths = Path(folder).iterdir()
+    filepaths = sorted(str(path) for path in filepaths if Path(path).is_file())
+    upload_type = config["ipfs"]["upload_type"]
+    if upload_type == UploadType.PINATA.value:
+        cid = pin_directory_with_pinata(folder, filepaths)
+    elif upload_type == UploadType.DRY_RUN.value:
+        cid = compute_directory_cid(filepaths)
+    else:
+        cid = pin_directory_with_local_IPFS_node(folder, filepaths)
+
+    print(f"{folder}: ipfs://{cid} ({len(filepaths)} files)")
+    return cid
+
+
+def pin_directory_with_local_IPFS_node(folder, filepaths):
+    car_path = f"{Path(folder)}.car"
+    write_car(filepaths, car_path)
+
+    try:
+        with MultipartFileStream(car_path) as body:
+            # info from https://docs.ipfs.tech/reference/kubo/rpc/#api-v0-dag-import
+            ipfs_url = "http://127.0.0.1:5001"
+            endpoint = "/api/v0/dag/import"
+
+            response = get_uploader().post(
+                ipfs_url + endpoint,
+                rate_limited=False,  # the local node has no request quota
+                headers={"Content-Type": body.content_type},
+                data=body,
+            )
+    finally:
+        os.remove(car_path)
+
+    return json.loads(response.text.splitlines()[0])["Root"]["Cid"]["/"]
+
+
+def pin_directory_with_pinata(folder, filepaths):
+    folder_name = Path(folder).name
+    # files sharing the folder_name/ prefix are pinned as one directory
+    files = [
+        ("file", f"{folder_name}/{os.path.basename(path)}", path) for path in filepaths
+    ]
+    fields = {
+        "pinataMetadata": json.dumps({"name": folder_name}),
+        "pinataOptions": json.dumps({"cidVersion": 0}),
+    }
+
+    with MultipartFileStream(files=files, fields=fields) as body:
         # info from https://docs.pinata.cloud/pinata-api/pinning/pin-file-or-directory
         pinata_url = "https://api.pinata.cloud"
         endpoint = "/pinning/pinFileToIPFS"
-        filename = filepath.split("/")[-1]
-        header = {"Authorization": config["ipfs"]["pinata_jwm"]}
+        header = {
+            "Authorization": config["ipfs"]["pinata_jwm"],
+            "Content-Type": body.content_type,
+        }
 
-        response = requests.post(
+        response = get_uploader().post(
             pinata_url + endpoint,
             headers=header,
-            files={"file": (filename, file_bin)},
+            data=body,
         )
 
-        ipfs_hash = response.json()["IpfsHash"]
-        file_uri = f"https://ipfs.io/ipfs/{ipfs_hash}?filename={filename}"
-
-        print(f"{filename}: {file_uri}")
-        return file_uri
+    return response.json()["IpfsHash"]
@@ -1,6 +1,6 @@
 from enum import Enum
 from brownie import Contract, network, accounts, config
-from brownie import MockV3Aggregator, MockWETH, MockDAI
+from brownie import MockV3Aggregator, MockWETH, MockDAI, MockMulticall
 import eth_utils
 
 LOCAL_BLOCKCHAIN_ENVIRONMENTS = ["development", "ganache-local"]
@@ -15,6 +15,7 @@ class MockContract(Enum):
     FAU_TOKEN = "fau_token"
     ETH_USD_FEED = "eth_usd_feed"
     DAI_USD_FEED = "dai_usd_feed"
+    MULTICALL = "multicall"
 
 
 contract_to_mock = {
@@ -22,6 +23,7 @@ contract_to_mock = {
     MockContract.FAU_TOKEN: MockDAI,
     MockContract.ETH_USD_FEED: MockV3Aggregator,
     MockContract.DAI_USD_FEED: MockV3Aggregator,
+    MockContract.MULTICALL: MockMulticall,
 }
 
 
@@ -74,6 +76,8 @@ def deploy_mock(contract_enum):
         MockV3Aggregator.deploy(DECIMALS, WETH_STARTING_PRICE, {"from": get_account()})
     elif contract_enum == MockContract.DAI_USD_FEED:
         MockV3Aggregator.deploy(DECIMALS, DAI_STARTING_PRICE, {"from": get_account()})
+    elif contract_enum == MockContract.MULTICALL:
+        MockMulticall.deploy({"from": get_account()})
 
     print(f"Mock {contract_enum.value} deployed!\n")
 
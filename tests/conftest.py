@@ -1,6 +1,9 @@
 from web3 import Web3
+from eth_account import Account
+from eth_account.messages import encode_structured_data
 import pytest
 from brownie import (
+    chain,
     BrickToken,
     MockERC20,
     MockDAI,
@@ -9,6 +12,8 @@ from brownie import (
     TokenValue,
     MockV3Aggregator,
     OrderBook,
+    CoincreteAsset,
+    RentDistributor,
 )
 from scripts.utilities import get_account
 
@@ -112,6 +117,59 @@ def token_value_ETH(ETH_price, decimals, account):
 # endregion
 
 
+# region Permit USD
+@pytest.fixture
+def permit_usd(brick_token, token_value_DAI, account):
+    # a dollar stablecoin that supports EIP-2612 permit, unlike MockDAI
+    mock_usd = MockERC20.deploy("Permit USD", "PUSD", {"from": account})
+    brick_token.addAllowedToken(mock_usd.address, {"from": account})
+    brick_token.setTokenPriceFeed(mock_usd.address, token_value_DAI, {"from": account})
+    return mock_usd
+
+
+# endregion
+
+
+@pytest.fixture
+def sign_permit():
+    def _sign_permit(token, owner, spender, value, deadline):
+        permit = {
+            "types": {
+                "EIP712Domain": [
+                    {"name": "name", "type": "string"},
+                    {"name": "version", "type": "string"},
+                    {"name": "chainId", "type": "uint256"},
+                    {"name": "verifyingContract", "type": "address"},
+                ],
+                "Permit": [
+                    {"name": "owner", "type": "address"},
+                    {"name": "spender", "type": "address"},
+                    {"name": "value", "type": "uint256"},
+                    {"name": "nonce", "type": "uint256"},
+                    {"name": "deadline", "type": "uint256"},
+                ],
+            },
+            "primaryType": "Permit",
+            "domain": {
+                "name": token.name(),
+                "version": "1",
+                "chainId": chain.id,
+                "verifyingContract": token.address,
+            },
+            "message": {
+                "owner": owner.address,
+                "spender": spender.address,
+                "value": value,
+                "nonce": token.nonces(owner),
+                "deadline": deadline,
+            },
+        }
+        signed = Account.sign_message(encode_structured_data(permit), owner.private_key)
+        return signed.v, signed.r, signed.s
+
+    return _sign_permit
+
+
 @pytest.fixture
 def token():
     return "0x345f9bFd2468f56CcCCb961c29Cf2a454E0812Cd"
@@ -142,3 +200,21 @@ def order_book(book_token, price_token, supply, account):
 
 
 # endregion
+
+
+# region CoincreteAsset
+@pytest.fixture
+def coincrete_asset(brick_token, account):
+    return CoincreteAsset.deploy(brick_token, {"from": account})
+
+
+# endregion
+
+
+# region RentDistributor
+@pytest.fixture
+def rent_distributor(brick_token, account):
+    return RentDistributor.deploy(brick_token, {"from": account})
+
+
+# endregion
@@ -1,4 +1,4 @@
-from brownie import network, exceptions
+from brownie import network, exceptions, accounts, chain
 from brownie import BrickToken
 import brownie
 import pytest
@@ -176,6 +176,7 @@ def test_buy_fail_allowance_not_approved(brick_token, dai, amount, account):
 
 # endregion
 
+
 # region cashout
 def test_cashout_success(brick_token, dai, amount, account):
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
@@ -212,6 +213,100 @@ def test_cashout_fail_not_owner(brick_token, dai, amount, account):
         brick_token.cashOut({"from": not_owner})
 
 
+def test_cashout_then_buy_lists_token_again(brick_token, dai, eth, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.buy(amount, dai.address, {"from": account})
+    brick_token.buy(amount, eth.address, {"from": account})
+    brick_token.cashOut({"from": account})
+
+    # Act
+    brick_token.buy(amount, eth.address, {"from": account})
+
+    # Assert
+    assert brick_token.tokenWithDeposits(0) == eth.address
+    with pytest.raises(exceptions.VirtualMachineError):
+        assert brick_token.tokenWithDeposits(1)
+
+
+def test_cashout_partial_success(brick_token, dai, eth, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.buy(amount, dai.address, {"from": account})
+    brick_token.buy(amount, eth.address, {"from": account})
+    old_dai_balance = dai.balanceOf(account)
+    old_eth_balance = eth.balanceOf(account)
+
+    # Act
+    tx = brick_token.cashOut(
+        [dai.address, eth.address], [amount // 2, amount], False, {"from": account}
+    )
+
+    # Assert
+    assert dai.balanceOf(account) == old_dai_balance + amount // 2
+    assert eth.balanceOf(account) == old_eth_balance + amount
+    assert brick_token.token_deposit(dai.address) == amount - amount // 2
+    assert brick_token.token_deposit(eth.address) == 0
+    assert brick_token.tokenWithDeposits(0) == dai.address
+    with pytest.raises(exceptions.VirtualMachineError):
+        assert brick_token.tokenWithDeposits(1)
+    assert tx.events["CashedOut"]["admin"] == account
+
+
+def test_cashout_deferred_then_withdraw(brick_token, dai, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.buy(amount, dai.address, {"from": account})
+    old_dai_balance = dai.balanceOf(account)
+    brick_token.cashOut([dai.address], [amount], True, {"from": account})
+    assert dai.balanceOf(account) == old_dai_balance
+    assert brick_token.token_owed(dai.address) == amount
+    assert brick_token.token_deposit(dai.address) == 0
+
+    # Act
+    tx = brick_token.withdrawTreasury(dai.address, {"from": account})
+
+    # Assert
+    assert dai.balanceOf(account) == old_dai_balance + amount
+    assert dai.balanceOf(brick_token.address) == 0
+    assert brick_token.token_owed(dai.address) == 0
+    assert tx.events["WithdrewTreasury"]["token"] == dai.address
+    assert tx.events["WithdrewTreasury"]["amount"] == amount
+
+
+def test_cashout_partial_fail_more_than_deposit(brick_token, dai, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.buy(amount, dai.address, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Amount must be lower than deposit"):
+        brick_token.cashOut([dai.address], [amount + 1], False, {"from": account})
+
+
+def test_withdrawTreasury_fail_nothing_owed(brick_token, dai, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Nothing to withdraw"):
+        brick_token.withdrawTreasury(dai.address, {"from": account})
+
+
 # endregion
 
 # region sell
@@ -319,6 +414,24 @@ def test_sell_fail_token_no_tokens_available(brick_token, dai, amount, account):
         brick_token.sell(amount, dai, {"from": account})
 
 
+def test_sell_keeps_spread_in_one_transfer(brick_token, dai, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.buy(amount, dai.address, {"from": account})
+    amount_kept = amount * 25 // 100
+
+    # Act
+    tx = brick_token.sell(amount, dai.address, {"from": account})
+
+    # Assert
+    assert tx.events["Sold"]["amountKept"] == amount_kept
+    assert tx.events["Sold"]["amountIn"] == amount - amount_kept
+    assert len(tx.events["Transfer"]) == 2
+    assert "FilledUp" not in tx.events
+
+
 # endregion
 
 # region fillUp
@@ -390,3 +503,449 @@ def test_fillUp_fail_amount_is_not_enought(brick_token, dai, account):
 
 
 # endregion
+
+# region permit
+
+
+def test_permit_success(brick_token, sign_permit, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    owner = accounts.add()
+    spender = get_account(index=1)
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(brick_token, owner, spender, amount, deadline)
+
+    # Act
+    brick_token.permit(owner, spender, amount, deadline, v, r, s, {"from": account})
+
+    # Assert
+    assert brick_token.allowance(owner, spender) == amount
+    assert brick_token.nonces(owner) == 1
+
+
+def test_permit_fail_expired_deadline(brick_token, sign_permit, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    owner = accounts.add()
+    spender = get_account(index=1)
+    deadline = chain.time() - 1
+    v, r, s = sign_permit(brick_token, owner, spender, amount, deadline)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("ERC20Permit: expired deadline"):
+        brick_token.permit(owner, spender, amount, deadline, v, r, s, {"from": account})
+
+
+def test_buyWithPermit_success(brick_token, permit_usd, sign_permit, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    buyer = accounts.add()
+    account.transfer(buyer, "1 ether")
+    permit_usd.mint(buyer, amount, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(permit_usd, buyer, brick_token, amount, deadline)
+
+    # Act
+    tx = brick_token.buyWithPermit(
+        amount, permit_usd, deadline, v, r, s, {"from": buyer}
+    )
+
+    # Assert
+    assert permit_usd.balanceOf(buyer) == 0
+    assert permit_usd.allowance(buyer, brick_token) == 0
+    assert permit_usd.nonces(buyer) == 1
+    assert brick_token.token_deposit(permit_usd) == amount
+    assert brick_token.balanceOf(buyer) == amount
+    assert tx.events["Bought"]["exchangeToken"] == permit_usd.address
+
+
+def test_buyWithPermit_success_permit_front_run(
+    brick_token, permit_usd, sign_permit, amount, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    buyer = accounts.add()
+    account.transfer(buyer, "1 ether")
+    permit_usd.mint(buyer, amount, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(permit_usd, buyer, brick_token, amount, deadline)
+    # someone replays the signature from the mempool first, burning the nonce
+    permit_usd.permit(buyer, brick_token, amount, deadline, v, r, s, {"from": account})
+
+    # Act
+    brick_token.buyWithPermit(amount, permit_usd, deadline, v, r, s, {"from": buyer})
+
+    # Assert
+    assert permit_usd.balanceOf(buyer) == 0
+    assert brick_token.balanceOf(buyer) == amount
+
+
+def test_buyWithPermit_fail_invalid_signature(
+    brick_token, permit_usd, sign_permit, amount, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    buyer = accounts.add()
+    account.transfer(buyer, "1 ether")
+    permit_usd.mint(buyer, amount, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(permit_usd, buyer, brick_token, amount // 2, deadline)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Permit failed"):
+        brick_token.buyWithPermit(
+            amount, permit_usd, deadline, v, r, s, {"from": buyer}
+        )
+
+
+def test_fillUpWithPermit_success(
+    brick_token, permit_usd, sign_permit, amount, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    funder = accounts.add()
+    account.transfer(funder, "1 ether")
+    permit_usd.mint(funder, amount, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(permit_usd, funder, brick_token, amount, deadline)
+
+    # Act
+    tx = brick_token.fillUpWithPermit(
+        amount, permit_usd, deadline, v, r, s, {"from": funder}
+    )
+
+    # Assert
+    assert permit_usd.balanceOf(funder) == 0
+    assert permit_usd.balanceOf(brick_token) == amount
+    assert brick_token.token_deposit(permit_usd) == amount
+    assert tx.events["FilledUp"]["amount"] == amount
+    assert tx.events["FilledUp"]["token"] == permit_usd.address
+
+
+def test_fillUpWithPermit_success_permit_front_run(
+    brick_token, permit_usd, sign_permit, amount, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    funder = accounts.add()
+    account.transfer(funder, "1 ether")
+    permit_usd.mint(funder, amount, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(permit_usd, funder, brick_token, amount, deadline)
+    permit_usd.permit(funder, brick_token, amount, deadline, v, r, s, {"from": account})
+
+    # Act
+    brick_token.fillUpWithPermit(
+        amount, permit_usd, deadline, v, r, s, {"from": funder}
+    )
+
+    # Assert
+    assert permit_usd.balanceOf(brick_token) == amount
+    assert brick_token.token_deposit(permit_usd) == amount
+
+
+# endregion
+
+# region releaseAprBrick
+
+
+def test_releaseAprBrick_success(brick_token, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    receiver = get_account(index=1)
+    old_apr_brick = brick_token.aprBrick()
+    old_buyable_tokens = brick_token.buyableTokens()
+
+    # Act
+    tx = brick_token.releaseAprBrick(receiver, amount, {"from": account})
+
+    # Assert
+    assert brick_token.aprBrick() == old_apr_brick - amount
+    assert brick_token.buyableTokens() == old_buyable_tokens
+    assert brick_token.balanceOf(receiver) == amount
+    assert tx.events["ReleasedAprBrick"]["to"] == receiver
+    assert tx.events["ReleasedAprBrick"]["amount"] == amount
+
+
+def test_releaseAprBrick_fail_more_than_reserve(brick_token, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    amount = brick_token.aprBrick() + 1
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Amount must be lower than APR reserve"):
+        brick_token.releaseAprBrick(account, amount, {"from": account})
+
+
+def test_releaseAprBrick_fail_not_owner(brick_token, amount):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    not_owner = get_account(1)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        brick_token.releaseAprBrick(not_owner, amount, {"from": not_owner})
+
+
+# endregion
+
+
+# region allowTokens
+def test_removeAllowedToken_swaps_last_token(brick_token, dai, eth, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    assert brick_token.allowedTokens(0) == brick_token.address
+
+    # Act
+    tx = brick_token.removeAllowedToken(brick_token.address, {"from": account})
+
+    # Assert
+    assert brick_token.allowedTokens(0) == eth.address
+    assert brick_token.allowedTokens(1) == dai.address
+    with pytest.raises(exceptions.VirtualMachineError):
+        assert brick_token.allowedTokens(2)
+    assert not brick_token.isTokenAllowed(brick_token.address)
+    assert brick_token.isTokenAllowed(eth.address)
+    assert brick_token.isTokenAllowed(dai.address)
+    assert tx.events["DisallowToken"]["token"] == brick_token.address
+
+    # the moved token keeps a valid index
+    brick_token.removeAllowedToken(eth.address, {"from": account})
+    assert brick_token.allowedTokens(0) == dai.address
+    assert not brick_token.isTokenAllowed(eth.address)
+
+
+def test_addAllowedToken_fail_already_allowed(brick_token, dai, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("The token is already allowed"):
+        brick_token.addAllowedToken(dai.address, {"from": account})
+
+
+def test_removeAllowedToken_fail_not_allowed(brick_token, token, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("The token is already unallowed"):
+        brick_token.removeAllowedToken(token, {"from": account})
+
+
+def test_addAllowedToken_after_remove(brick_token, dai, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.removeAllowedToken(dai.address, {"from": account})
+
+    # Act
+    brick_token.addAllowedToken(dai.address, {"from": account})
+
+    # Assert
+    assert brick_token.isTokenAllowed(dai.address)
+    assert brick_token.allowedTokens(2) == dai.address
+
+
+# endregion
+
+
+# region tokenValue
+def test_getTokenFromToken_matches_two_steps(brick_token, eth, amount):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    value = brick_token.getValueFromToken(amount, eth)
+
+    # Act
+    amount_out = brick_token.getTokenFromToken(amount, eth, brick_token)
+
+    # Assert
+    assert amount_out == brick_token.getTokenFromValue(value, brick_token)
+
+
+def test_buy_fail_stale_price(brick_token, dai, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.setTokenHeartbeat(dai, 3600, {"from": account})
+    chain.sleep(3601)
+    chain.mine()
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Stale price"):
+        brick_token.buy(amount, dai.address, {"from": account})
+
+
+def test_buy_success_fresh_price(brick_token, dai, amount, account, token_value_DAI):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.setTokenHeartbeat(dai, 3600, {"from": account})
+    chain.sleep(3601)
+    token_value_DAI.updateAnswer(token_value_DAI.latestAnswer(), {"from": account})
+
+    # Act
+    tx = brick_token.buy(amount, dai.address, {"from": account})
+
+    # Assert
+    assert tx.events["Bought"]["amountOut"] == amount
+
+
+def test_buy_fail_invalid_price(brick_token, eth, amount, account, token_value_ETH):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    token_value_ETH.updateAnswer(0, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Invalid price"):
+        brick_token.buy(amount, eth.address, {"from": account})
+
+
+def test_setTokenHeartbeat_fail_not_owner(brick_token, dai):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    not_owner = get_account(1)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        brick_token.setTokenHeartbeat(dai, 3600, {"from": not_owner})
+
+
+def test_setTokenPriceFeed_fail_not_owner(brick_token, dai, token_value_ETH):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    not_owner = get_account(1)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        brick_token.setTokenPriceFeed(dai, token_value_ETH, {"from": not_owner})
+
+
+# endregion
+
+
+# region quote
+def test_quoteBuy_success(brick_token, dai, eth, token, amount):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    eth_value = brick_token.getValueFromToken(amount, eth)
+
+    # Act
+    amounts_out, available = brick_token.quoteBuy(
+        [amount, amount, amount], [dai, eth, token]
+    )
+
+    # Assert
+    assert amounts_out[0] == amount
+    assert amounts_out[1] == brick_token.getTokenFromValue(eth_value, brick_token)
+    assert amounts_out[2] == 0
+    assert available == brick_token.buyableTokens()
+
+
+def test_quoteBuy_matches_buy(brick_token, eth, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    amounts_out, _ = brick_token.quoteBuy([amount], [eth])
+
+    # Act
+    tx = brick_token.buy(amount, eth.address, {"from": account})
+
+    # Assert
+    assert tx.events["Bought"]["amountOut"] == amounts_out[0]
+
+
+def test_quoteBuy_fail_length_mismatch(brick_token, dai, amount):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Amounts and tokens length mismatch"):
+        brick_token.quoteBuy([amount, amount], [dai])
+
+
+def test_quoteSell_matches_sell(brick_token, dai, eth, token, amount, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    brick_token.buy(amount, dai.address, {"from": account})
+    amounts_out, available = brick_token.quoteSell(amount, [dai, eth, token])
+
+    # Act
+    tx = brick_token.sell(amount, dai.address, {"from": account})
+
+    # Assert
+    assert amounts_out[0] == amount * 75 // 100
+    assert amounts_out[0] == tx.events["Sold"]["amountOut"]
+    assert amounts_out[2] == 0
+    assert available[0] == amount
+    assert available[1] == 0
+    assert available[2] == 0
+
+
+# endregion
@@ -0,0 +1,724 @@
+from brownie import network, chain
+from brownie import CoincreteAsset
+import brownie
+import pytest
+from scripts.utilities import get_account, LOCAL_BLOCKCHAIN_ENVIRONMENTS
+
+PRICE_PER_UNIT = 1000 * 10**18
+APR = 1000  # 10%
+BPS = 10000
+YEAR = 365 * 24 * 60 * 60
+
+
+def to_bytes32(text):
+    return "0x" + text.encode().hex().ljust(64, "0")
+
+
+def expected_rent(units, elapsed):
+    return units * PRICE_PER_UNIT * APR * elapsed // (BPS * YEAR)
+
+
+@pytest.fixture
+def rented_asset(coincrete_asset, brick_token, account):
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.setPricePerUnit(1, PRICE_PER_UNIT, {"from": account})
+    coincrete_asset.setAPR(1, APR, {"from": account})
+    brick_token.releaseAprBrick(
+        coincrete_asset, brick_token.aprBrick(), {"from": account}
+    )
+    return coincrete_asset
+
+
+def test_can_deploy_contract(brick_token):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    account = get_account()
+
+    # Act
+    ca = CoincreteAsset.deploy(brick_token, {"from": account})
+
+    # Assert
+    assert ca._brickToken() == brick_token.address
+    assert ca.owner() == account
+    assert ca.tokenID_data(1) == ("0x" + "00" * 32, 0, 0, 0, 0)
+
+
+# region mint
+def test_mint_success(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    token_id = 1
+    coincrete_asset.setTotalSupply(token_id, 100, {"from": account})
+
+    # Act
+    coincrete_asset.mint(token_id, 40, {"from": account})
+    coincrete_asset.mint(token_id, 60, {"from": account})
+
+    # Assert
+    assert coincrete_asset.balanceOf(account, token_id) == 100
+    assert coincrete_asset.totalSupply(token_id) == 100
+    assert coincrete_asset.tokenID_data(token_id)[3] == 100
+    assert coincrete_asset.tokenID_data(token_id)[4] == 100
+
+
+def test_mint_fail_amount_zero(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Cannot mint 0 tokens"):
+        coincrete_asset.mint(1, 0, {"from": account})
+
+
+def test_mint_fail_more_than_max_amount(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.mint(1, 60, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Cannot mint more than max amount"):
+        coincrete_asset.mint(1, 41, {"from": account})
+
+
+def test_mintBatch_success(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.setTotalSupply(2, 50, {"from": account})
+
+    # Act
+    tx = coincrete_asset.mintBatch([1, 2], [100, 20], {"from": account})
+
+    # Assert
+    assert coincrete_asset.balanceOf(account, 1) == 100
+    assert coincrete_asset.balanceOf(account, 2) == 20
+    assert coincrete_asset.totalSupply(1) == 100
+    assert coincrete_asset.totalSupply(2) == 20
+    assert tx.events["TransferBatch"]["ids"] == [1, 2]
+
+
+def test_mintBatch_fail_more_than_max_amount(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.setTotalSupply(2, 50, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Cannot mint more than max amount"):
+        coincrete_asset.mintBatch([1, 2], [100, 51], {"from": account})
+
+
+def test_mintBatch_fail_length_mismatch(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("IDs and amounts length mismatch"):
+        coincrete_asset.mintBatch([1, 2], [10], {"from": account})
+
+
+def test_mint_fail_not_owner(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    not_owner = get_account(index=1)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        coincrete_asset.mint(1, 10, {"from": not_owner})
+    with brownie.reverts("Ownable: caller is not the owner"):
+        coincrete_asset.mintBatch([1], [10], {"from": not_owner})
+
+
+# endregion
+
+
+# region registerTokens
+def test_registerTokens_success(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [
+        (to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 100),
+        (to_bytes32("BETA"), 2 * PRICE_PER_UNIT, 2 * APR, 0, 200),
+    ]
+
+    # Act
+    tx = coincrete_asset.registerTokens(data, [1, 2], {"from": account})
+
+    # Assert
+    assert coincrete_asset.tokenID_data(1) == data[0]
+    assert coincrete_asset.tokenID_data(2) == data[1]
+    assert tx.events["RegisteredTokens"]["tokenIDs"] == [1, 2]
+
+
+def test_registerTokens_success_keeps_current_amount(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.mint(1, 40, {"from": account})
+    data = [(to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 50)]
+
+    # Act
+    coincrete_asset.registerTokens(data, [1], {"from": account})
+
+    # Assert
+    assert coincrete_asset.tokenID_data(1) == (
+        to_bytes32("ALPHA"),
+        PRICE_PER_UNIT,
+        APR,
+        40,
+        50,
+    )
+
+
+def test_registerTokens_fail_max_lower_than_current(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.mint(1, 40, {"from": account})
+    data = [(to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 39)]
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Max amount lower than current amount"):
+        coincrete_asset.registerTokens(data, [1], {"from": account})
+
+
+def test_registerTokens_fail_empty_name(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [(to_bytes32(""), PRICE_PER_UNIT, APR, 0, 100)]
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Name cannot be empty"):
+        coincrete_asset.registerTokens(data, [1], {"from": account})
+
+
+def test_registerTokens_fail_not_owner(coincrete_asset):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    not_owner = get_account(1)
+    data = [(to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 100)]
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        coincrete_asset.registerTokens(data, [1], {"from": not_owner})
+
+
+# endregion
+
+
+# region setTotalSupply
+def test_setTotalSupply_fail_not_owner(coincrete_asset):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    not_owner = get_account(1)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        coincrete_asset.setTotalSupply(1, 100, {"from": not_owner})
+
+
+def test_setTotalSupply_fail_overflow(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("SafeCast: value doesn't fit in 64 bits"):
+        coincrete_asset.setTotalSupply(1, 2**64, {"from": account})
+
+
+def test_setTotalSupply_fail_lower_than_current_amount(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.mint(1, 10, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Max amount lower than current amount"):
+        coincrete_asset.setTotalSupply(1, 9, {"from": account})
+
+
+# endregion
+
+
+# region rent
+def test_claim_success_single_holder(rented_asset, brick_token, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    mint_tx = rented_asset.mint(1, 10, {"from": account})
+    old_brick_balance = brick_token.balanceOf(account)
+    chain.sleep(30 * 24 * 60 * 60)
+
+    # Act
+    tx = rented_asset.claim([1], {"from": account})
+
+    # Assert
+    rent = expected_rent(10, tx.timestamp - mint_tx.timestamp)
+    assert tx.events["ClaimedRent"]["user"] == account
+    assert tx.events["ClaimedRent"]["value"] == rent
+    assert tx.events["ClaimedRent"]["amount"] == rent
+    assert brick_token.balanceOf(account) == old_brick_balance + rent
+
+
+def test_claim_success_after_transfer(rented_asset, brick_token, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    receiver = get_account(index=1)
+    mint_tx = rented_asset.mint(1, 10, {"from": account})
+    chain.sleep(10 * 24 * 60 * 60)
+    transfer_tx = rented_asset.safeTransferFrom(
+        account, receiver, 1, 5, "", {"from": account}
+    )
+    chain.sleep(10 * 24 * 60 * 60)
+
+    # Act
+    receiver_tx = rented_asset.claim([1], {"from": receiver})
+    account_tx = rented_asset.claim([1], {"from": account})
+
+    # Assert
+    assert receiver_tx.events["ClaimedRent"]["value"] == expected_rent(
+        5, receiver_tx.timestamp - transfer_tx.timestamp
+    )
+    unit_seconds = 10 * (transfer_tx.timestamp - mint_tx.timestamp) + 5 * (
+        account_tx.timestamp - transfer_tx.timestamp
+    )
+    assert account_tx.events["ClaimedRent"]["value"] == expected_rent(1, unit_seconds)
+
+
+def test_claim_success_apr_change(rented_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    mint_tx = rented_asset.mint(1, 10, {"from": account})
+    chain.sleep(10 * 24 * 60 * 60)
+    apr_tx = rented_asset.setAPR(1, 0, {"from": account})
+    chain.sleep(10 * 24 * 60 * 60)
+
+    # Act
+    tx = rented_asset.claim([1], {"from": account})
+
+    # Assert
+    assert tx.events["ClaimedRent"]["value"] == expected_rent(
+        10, apr_tx.timestamp - mint_tx.timestamp
+    )
+
+
+def test_claim_success_until_rent_distribution(rented_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    mint_tx = rented_asset.mint(1, 10, {"from": account})
+    chain.sleep(10 * 24 * 60 * 60)
+    start_tx = rented_asset.startRentDistribution({"from": account})
+    chain.sleep(10 * 24 * 60 * 60)
+
+    # Act
+    tx = rented_asset.claim([1], {"from": account})
+
+    # Assert
+    assert tx.events["ClaimedRent"]["value"] == expected_rent(
+        10, start_tx.timestamp - mint_tx.timestamp
+    )
+    assert rented_asset.rentDistributionStartBlock() == start_tx.block_number
+    assert rented_asset.pendingRent(account, 1) == 0
+
+
+def test_startRentDistribution_fail_already_started(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    coincrete_asset.startRentDistribution({"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Rent distribution already started"):
+        coincrete_asset.startRentDistribution({"from": account})
+
+
+def test_claim_fail_nothing_to_claim(rented_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("No rent to claim"):
+        rented_asset.claim([1], {"from": account})
+
+
+def test_setAPR_fail_not_owner(coincrete_asset):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    not_owner = get_account(1)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        coincrete_asset.setAPR(1, APR, {"from": not_owner})
+
+
+# endregion
+
+
+# region getCatalog
+def test_getCatalog_success_empty(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+    catalog = coincrete_asset.getCatalog(0, 10, {"from": account})
+
+    # Assert
+    assert catalog == []
+    assert coincrete_asset.catalogLength() == 0
+
+
+def test_getCatalog_success_paginated(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [
+        (to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 100),
+        (to_bytes32("BETA"), PRICE_PER_UNIT, APR, 0, 100),
+        (to_bytes32("GAMMA"), PRICE_PER_UNIT, APR, 0, 100),
+    ]
+    coincrete_asset.registerTokens(data, [3, 1, 2], {"from": account})
+    coincrete_asset.registerTokens(data[:1], [3], {"from": account})
+    coincrete_asset.mint(1, 10, {"from": account})
+
+    # Act
+    first_page = coincrete_asset.getCatalog(0, 2, {"from": account})
+    second_page = coincrete_asset.getCatalog(2, 2, {"from": account})
+
+    # Assert
+    assert coincrete_asset.catalogLength() == 3
+    assert [entry[0] for entry in first_page + second_page] == [3, 1, 2]
+    assert first_page[0][1] == data[0]
+    assert first_page[1][1] == (to_bytes32("BETA"), PRICE_PER_UNIT, APR, 10, 100)
+    assert second_page[0][2] == coincrete_asset.uri(2)
+
+
+# endregion
+
+
+# region uri
+def test_uri_success(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [
+        (to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 100),
+        (to_bytes32("BETA"), PRICE_PER_UNIT, APR, 0, 100),
+    ]
+    coincrete_asset.registerTokens(data, [1, 2], {"from": account})
+
+    # Act
+    uri = coincrete_asset.uri(1)
+    uris = coincrete_asset.uris([1, 2])
+
+    # Assert
+    assert uri == "https://coincrete.com/api/asset/ALPHA.json"
+    assert uris == [
+        "https://coincrete.com/api/asset/ALPHA.json",
+        "https://coincrete.com/api/asset/BETA.json",
+    ]
+
+
+def test_uri_success_new_prefix_and_name(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [(to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 100)]
+    coincrete_asset.registerTokens(data, [1], {"from": account})
+
+    # Act
+    coincrete_asset.setURIPrefix("ipfs://cid/", {"from": account})
+    coincrete_asset.setTokenURI(1, "1", {"from": account})
+
+    # Assert
+    assert coincrete_asset.uri(1) == "ipfs://cid/1.json"
+
+
+def test_uri_fail_nonexistent_token(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("ERC1155: nonexistent token"):
+        coincrete_asset.uri(1)
+
+
+def test_set_token_uri_fail_empty_name(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [(to_bytes32("ALPHA"), PRICE_PER_UNIT, APR, 0, 100)]
+    coincrete_asset.registerTokens(data, [1], {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Name cannot be empty"):
+        coincrete_asset.setTokenURI(1, "", {"from": account})
+    assert coincrete_asset.uri(1) == "https://coincrete.com/api/asset/ALPHA.json"
+
+
+# endregion
+
+
+# region snapshots
+def test_balanceOfAt_success(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    receiver = get_account(index=1)
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+
+    # Act
+    mint_tx = coincrete_asset.mint(1, 10, {"from": account})
+    transfer_tx = coincrete_asset.safeTransferFrom(
+        account, receiver, 1, 4, "", {"from": account}
+    )
+    second_mint_tx = coincrete_asset.mint(1, 5, {"from": account})
+    chain.mine()
+
+    # Assert
+    assert coincrete_asset.balanceOfAt(account, 1, mint_tx.block_number - 1) == 0
+    assert coincrete_asset.balanceOfAt(account, 1, mint_tx.block_number) == 10
+    assert coincrete_asset.balanceOfAt(account, 1, transfer_tx.block_number) == 6
+    assert coincrete_asset.balanceOfAt(receiver, 1, mint_tx.block_number) == 0
+    assert coincrete_asset.balanceOfAt(receiver, 1, transfer_tx.block_number) == 4
+    assert coincrete_asset.balanceOfAt(account, 1, second_mint_tx.block_number) == 11
+    assert coincrete_asset.balanceOfAt(receiver, 1, second_mint_tx.block_number) == 4
+    assert coincrete_asset.totalSupplyAt(1, mint_tx.block_number - 1) == 0
+    assert coincrete_asset.totalSupplyAt(1, transfer_tx.block_number) == 10
+    assert coincrete_asset.totalSupplyAt(1, second_mint_tx.block_number) == 15
+
+
+def test_balanceOfAt_fail_future_block(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Checkpoints: block not yet mined"):
+        coincrete_asset.balanceOfAt(account, 1, chain.height + 1)
+
+
+# endregion
+
+
+# region buyBatch
+def test_buyBatch_success_dai(coincrete_asset, dai, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    buyer = get_account(index=1)
+    price = 1 * 10**18
+    data = [
+        (to_bytes32("ALPHA"), price, APR, 0, 100),
+        (to_bytes32("BETA"), 2 * price, APR, 0, 100),
+    ]
+    coincrete_asset.registerTokens(data, [1, 2], {"from": account})
+    total = 10 * price + 20 * 2 * price
+    dai.mint(total, {"from": buyer})
+    dai.approve(coincrete_asset, total, {"from": buyer})
+    old_owner_balance = dai.balanceOf(account)
+
+    # Act
+    tx = coincrete_asset.buyBatch([1, 2], [10, 20], dai, {"from": buyer})
+
+    # Assert
+    assert coincrete_asset.balanceOf(buyer, 1) == 10
+    assert coincrete_asset.balanceOf(buyer, 2) == 20
+    assert coincrete_asset.totalSupply(1) == 10
+    assert coincrete_asset.totalSupply(2) == 20
+    assert dai.balanceOf(buyer) == 0
+    assert dai.balanceOf(account) == old_owner_balance + total
+    assert tx.events["BoughtBatch"]["from"] == buyer
+    assert tx.events["BoughtBatch"]["amountIn"] == total
+
+
+def test_buyBatch_success_eth(coincrete_asset, eth, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [(to_bytes32("ALPHA"), 3120 * 10**18, APR, 0, 100)]
+    coincrete_asset.registerTokens(data, [1], {"from": account})
+    eth.approve(coincrete_asset, 2 * 10**18, {"from": account})
+    old_eth_balance = eth.balanceOf(account)
+
+    # Act
+    tx = coincrete_asset.buyBatch([1], [1], eth, {"from": account})
+
+    # Assert
+    assert tx.events["BoughtBatch"]["amountIn"] == 2 * 10**18
+    assert eth.balanceOf(account) == old_eth_balance
+    assert coincrete_asset.balanceOf(account, 1) == 1
+
+
+def test_buyBatch_fail_token_not_allowed(coincrete_asset, token, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Cannot buy with this token"):
+        coincrete_asset.buyBatch([1], [1], token, {"from": account})
+
+
+def test_buyBatch_fail_more_than_max_amount(coincrete_asset, dai, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    data = [(to_bytes32("ALPHA"), 10**18, APR, 0, 100)]
+    coincrete_asset.registerTokens(data, [1], {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Cannot mint more than max amount"):
+        coincrete_asset.buyBatch([1], [101], dai, {"from": account})
+
+
+def test_buyBatch_fail_nonexistent_token(coincrete_asset, dai, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    buyer = get_account(index=1)
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.setPricePerUnit(1, PRICE_PER_UNIT, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("ERC1155: nonexistent token"):
+        coincrete_asset.buyBatch([1], [100], dai, {"from": buyer})
+    assert coincrete_asset.balanceOf(buyer, 1) == 0
+
+
+def test_buyBatch_fail_price_not_set(coincrete_asset, dai, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    buyer = get_account(index=1)
+    data = [(to_bytes32("ALPHA"), 0, APR, 0, 100)]
+    coincrete_asset.registerTokens(data, [1], {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Price not set"):
+        coincrete_asset.buyBatch([1], [100], dai, {"from": buyer})
+    assert coincrete_asset.balanceOf(buyer, 1) == 0
+
+
+def test_buyBatch_fail_payment_rounds_to_zero(coincrete_asset, eth, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    buyer = get_account(index=1)
+    data = [(to_bytes32("ALPHA"), 1, APR, 0, 100)]
+    coincrete_asset.registerTokens(data, [1], {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Amount must be more than 0 tokens"):
+        coincrete_asset.buyBatch([1], [1], eth, {"from": buyer})
+    assert coincrete_asset.balanceOf(buyer, 1) == 0
+
+
+# endregion
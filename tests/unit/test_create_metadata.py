@@ -0,0 +1,66 @@
+from brownie import network
+import pytest
+from scripts.create_metadata import check_unique_names, get_tokens_data
+from scripts.utilities import LOCAL_BLOCKCHAIN_ENVIRONMENTS
+
+PRICE_PER_UNIT = 1000 * 10**18
+APR = 1000  # 10%
+
+
+def to_bytes32(text):
+    return "0x" + text.encode().hex().ljust(64, "0")
+
+
+# region get_tokens_data
+def test_get_tokens_data_through_multicall(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    names = ["ALPHA", "BETA", "GAMMA"]
+    data = [(to_bytes32(name), PRICE_PER_UNIT, APR, 0, 100) for name in names]
+    coincrete_asset.registerTokens(data, [7, 3, 5], {"from": account})
+    coincrete_asset.mint(3, 10, {"from": account})
+
+    # Act
+    tokens_data = get_tokens_data(coincrete_asset)
+
+    # Assert
+    assert list(tokens_data) == [7, 3, 5]
+    for token_id in tokens_data:
+        assert tokens_data[token_id] == coincrete_asset.tokenID_data(token_id)
+    assert tokens_data[3][3] == 10
+
+
+# endregion
+
+
+# region check_unique_names
+def test_check_unique_names_success():
+    # Arrange
+    tokens_data = {
+        1: (bytes.fromhex(to_bytes32("ALPHA")[2:]), PRICE_PER_UNIT, APR, 0, 100),
+        2: (bytes.fromhex(to_bytes32("BETA")[2:]), PRICE_PER_UNIT, APR, 0, 100),
+    }
+
+    # Act
+    check_unique_names(tokens_data)
+
+    # Assert
+
+
+def test_check_unique_names_fail_duplicate_name():
+    # Arrange
+    tokens_data = {
+        token_id: (bytes.fromhex(to_bytes32("ALPHA")[2:]), price, APR, 0, 100)
+        for token_id, price in [(1, PRICE_PER_UNIT), (2, 2 * PRICE_PER_UNIT)]
+    }
+
+    # Act
+
+    # Assert
+    with pytest.raises(ValueError, match="ALPHA"):
+        check_unique_names(tokens_data)
+
+
+# endregion
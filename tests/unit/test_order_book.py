@@ -1,4 +1,4 @@
-from brownie import network, web3, exceptions
+from brownie import network, web3, exceptions, accounts, chain
 from brownie import OrderBook
 import brownie
 import pytest
@@ -677,6 +677,87 @@ def test_addBid_fail_greater_than_best_ask_price(order_book, account):
         order_book.addBid(price + 1, bid, {"from": account})
 
 
+def test_addBidWithPermit_success(order_book, price_token, sign_permit, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    bidder = accounts.add()
+    account.transfer(bidder, "1 ether")
+    bid = 10 * 10**18
+    price = 2 * 10**18
+    total = bid * price // 10**18
+    price_token.mint(bidder, total, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(price_token, bidder, order_book, total, deadline)
+
+    # Act
+    tx = order_book.addBidWithPermit(price, bid, deadline, v, r, s, {"from": bidder})
+
+    # Assert
+    assert price_token.balanceOf(order_book) == total
+    assert price_token.balanceOf(bidder) == 0
+    assert price_token.allowance(bidder, order_book) == 0
+    assert order_book.orderID_order(1) == (
+        bidder.address,
+        price,
+        bid,
+        bid,
+        0,
+        0,
+        order_book.orderID_order(1)[6],
+        0,
+    )
+    assert order_book.bestBidPrice() == price
+
+
+def test_addBidWithPermit_fail_invalid_signature(
+    order_book, price_token, sign_permit, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    bidder = accounts.add()
+    account.transfer(bidder, "1 ether")
+    bid = 10 * 10**18
+    price = 2 * 10**18
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(price_token, bidder, order_book, bid, deadline)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Permit failed"):
+        order_book.addBidWithPermit(price, bid, deadline, v, r, s, {"from": bidder})
+
+
+def test_addBidWithPermit_success_permit_front_run(
+    order_book, price_token, sign_permit, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    bidder = accounts.add()
+    account.transfer(bidder, "1 ether")
+    bid = 10 * 10**18
+    price = 2 * 10**18
+    total = bid * price // 10**18
+    price_token.mint(bidder, total, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(price_token, bidder, order_book, total, deadline)
+    price_token.permit(bidder, order_book, total, deadline, v, r, s, {"from": account})
+
+    # Act
+    order_book.addBidWithPermit(price, bid, deadline, v, r, s, {"from": bidder})
+
+    # Assert
+    assert price_token.balanceOf(order_book) == total
+    assert price_token.balanceOf(bidder) == 0
+    assert order_book.bestBidPrice() == price
+
+
 # endregion
 
 # region addAsk
@@ -1219,6 +1300,39 @@ def test_addAsk_fail_lower_than_best_bid_price(order_book, account):
         order_book.addAsk(price - 1, ask, {"from": account})
 
 
+def test_addAskWithPermit_success(order_book, book_token, sign_permit, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    asker = accounts.add()
+    account.transfer(asker, "1 ether")
+    ask = 10 * 10**18
+    price = 2 * 10**18
+    book_token.mint(asker, ask, {"from": account})
+    deadline = chain.time() + 3600
+    v, r, s = sign_permit(book_token, asker, order_book, ask, deadline)
+
+    # Act
+    tx = order_book.addAskWithPermit(price, ask, deadline, v, r, s, {"from": asker})
+
+    # Assert
+    assert book_token.balanceOf(order_book) == ask
+    assert book_token.balanceOf(asker) == 0
+    assert book_token.allowance(asker, order_book) == 0
+    assert order_book.orderID_order(1) == (
+        asker.address,
+        price,
+        ask,
+        ask,
+        1,
+        0,
+        order_book.orderID_order(1)[6],
+        0,
+    )
+    assert order_book.bestAskPrice() == price
+
+
 # endregion
 
 
@@ -1674,6 +1788,34 @@ def test_marketBuy_fail_no_open_asks(order_book, account):
         order_book.marketBuy(10 * 10**18, {"from": account})
 
 
+def test_marketBuy_success_partly_consumed_level(
+    order_book, book_token, supply, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    asker = get_account(index=1)
+    price = 1 * 10**18
+    ask = 5 * 10**18
+    book_token.mint(asker, supply, {"from": asker})
+    book_token.approve(order_book, supply, {"from": asker})
+    for _ in range(3):
+        order_book.addAsk(price, ask, {"from": asker})
+    order_book.marketBuy(7 * 10**18, {"from": account})
+    queue = order_book.getOrdersAtPrice(price, 1, 0, 10)
+
+    # Act
+    tx = order_book.marketBuy(3 * 10**18, {"from": account})
+
+    # Assert
+    # the filled head order is gone, the partly filled one is next in line
+    assert [(order[0], order[2]) for order in queue] == [(2, 3 * 10**18), (3, ask)]
+    assert tx.events["OrderMatched"]["askId"] == 2
+    assert tx.events["OrderMatched"]["amount"] == 3 * 10**18
+    assert [order[0] for order in order_book.getOrdersAtPrice(price, 1, 0, 10)] == [3]
+
+
 # endregion
 
 # region marketSell
@@ -2096,6 +2238,186 @@ def test_marketSell_fail_no_open_asks(order_book, account):
 # endregion
 
 
+# region limitBuy
+def test_limitBuy_success_sweep_levels_and_rest(
+    order_book, book_token, price_token, supply, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    asker = get_account(index=1)
+    price1 = 1 * 10**18
+    price2 = 2 * 10**18
+    price3 = 3 * 10**18
+
+    book_token.mint(asker, supply, {"from": asker})
+    book_token.approve(order_book, supply, {"from": asker})
+
+    ask = 10 * 10**18
+    buy = 25 * 10**18
+    order_book.addAsk(price1, ask, {"from": asker})
+    order_book.addAsk(price2, ask, {"from": asker})
+    order_book.addAsk(price3, ask, {"from": asker})
+    paid = (ask * price1 + ask * price2) // 10**18
+    escrow = (buy - 2 * ask) * price2 // 10**18
+
+    # Act
+    tx = order_book.limitBuy(price2, buy, {"from": account})
+
+    # Assert
+    assert order_book.orderID_order(4) == (
+        account.address,
+        (price1 + price2) // 2,
+        buy,
+        5 * 10**18,
+        2,
+        1,
+        order_book.orderID_order(4)[6],
+        order_book.orderID_order(4)[7],
+    )
+    assert order_book.orderID_order(5) == (
+        account.address,
+        price2,
+        5 * 10**18,
+        5 * 10**18,
+        0,
+        0,
+        order_book.orderID_order(5)[6],
+        0,
+    )
+    assert order_book.marketPrice() == price2
+    assert order_book.bestAskPrice() == price3
+    assert order_book.bestBidPrice() == price2
+    assert book_token.balanceOf(order_book) == ask
+    assert book_token.balanceOf(account) == supply + 2 * ask
+    assert price_token.balanceOf(order_book) == escrow
+    assert price_token.balanceOf(account) == supply - paid - escrow
+    assert price_token.balanceOf(asker) == paid
+    assert order_book.user_ordersId(account, 0) == 4
+    assert order_book.user_ordersId(account, 1) == 5
+
+
+def test_limitBuy_success_not_crossing(order_book, book_token, supply, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    asker = get_account(index=1)
+    bid = 10 * 10**18
+    price = 1 * 10**18
+
+    book_token.mint(asker, supply, {"from": asker})
+    book_token.approve(order_book, supply, {"from": asker})
+    order_book.addAsk(2 * price, bid, {"from": asker})
+
+    # Act
+    tx = order_book.limitBuy(price, bid, {"from": account})
+
+    # Assert
+    assert order_book.orderID_order(2) == (
+        account.address,
+        price,
+        bid,
+        bid,
+        0,
+        0,
+        order_book.orderID_order(2)[6],
+        0,
+    )
+    assert order_book.bestBidPrice() == price
+    assert order_book.bestAskPrice() == 2 * price
+
+
+def test_limitBuy_fail_price_zero(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Price must be greater than zero"):
+        order_book.limitBuy(0, 10 * 10**18, {"from": account})
+
+
+# endregion
+
+
+# region limitSell
+def test_limitSell_success_sweep_levels_and_rest(
+    order_book, book_token, price_token, supply, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    bidder = get_account(index=1)
+    price1 = 1 * 10**18
+    price2 = 2 * 10**18
+    price3 = 3 * 10**18
+
+    price_token.mint(bidder, supply, {"from": bidder})
+    price_token.approve(order_book, supply, {"from": bidder})
+
+    bid = 10 * 10**18
+    sell = 25 * 10**18
+    order_book.addBid(price1, bid, {"from": bidder})
+    order_book.addBid(price2, bid, {"from": bidder})
+    order_book.addBid(price3, bid, {"from": bidder})
+    received = (bid * price3 + bid * price2) // 10**18
+
+    # Act
+    tx = order_book.limitSell(price2, sell, {"from": account})
+
+    # Assert
+    assert order_book.orderID_order(4) == (
+        account.address,
+        (price3 + price2) // 2,
+        sell,
+        5 * 10**18,
+        3,
+        1,
+        order_book.orderID_order(4)[6],
+        order_book.orderID_order(4)[7],
+    )
+    assert order_book.orderID_order(5) == (
+        account.address,
+        price2,
+        5 * 10**18,
+        5 * 10**18,
+        1,
+        0,
+        order_book.orderID_order(5)[6],
+        0,
+    )
+    assert order_book.marketPrice() == price2
+    assert order_book.bestBidPrice() == price1
+    assert order_book.bestAskPrice() == price2
+    assert book_token.balanceOf(order_book) == 5 * 10**18
+    assert book_token.balanceOf(account) == supply - sell
+    assert book_token.balanceOf(bidder) == 2 * bid
+    assert price_token.balanceOf(order_book) == bid * price1 // 10**18
+    assert price_token.balanceOf(account) == supply + received
+
+
+def test_limitSell_fail_amount_zero(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Amount must be greater than zero"):
+        order_book.limitSell(10 * 10**18, 0, {"from": account})
+
+
+# endregion
+
+
 # region cancelOrder
 def test_cancelOrder_success_alone_bid(order_book, price_token, supply, account):
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
@@ -2521,6 +2843,84 @@ def test_getLiquidityDepthByPrice_success_multiple_bid(order_book, account):
 # endregion
 
 
+# region getOrdersAtPrice
+def test_getOrdersAtPrice_success_empty(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    price = 1 * 10**18
+
+    # Act
+    orders = order_book.getOrdersAtPrice(price, 0, 0, 10, {"from": account})
+
+    # Assert
+    assert orders == []
+
+
+def test_getOrdersAtPrice_success_queue_position(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    price = 1 * 10**18
+    amount = 10 * 10**18
+    order_book.addBid(price, amount, {"from": account})
+    order_book.addBid(price, 2 * amount, {"from": account})
+    order_book.addBid(price, 3 * amount, {"from": account})
+
+    # Act
+    orders = order_book.getOrdersAtPrice(price, 0, 0, 10, {"from": account})
+
+    # Assert
+    assert orders == [
+        (1, account.address, amount, 0),
+        (2, account.address, 2 * amount, amount),
+        (3, account.address, 3 * amount, 3 * amount),
+    ]
+
+
+def test_getOrdersAtPrice_success_paginated_asks(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    price = 1 * 10**18
+    amount = 10 * 10**18
+    order_book.addAsk(price, amount, {"from": account})
+    order_book.addAsk(price, 2 * amount, {"from": account})
+    order_book.addAsk(price, 3 * amount, {"from": account})
+
+    # Act
+    first_page = order_book.getOrdersAtPrice(price, 1, 0, 2, {"from": account})
+    second_page = order_book.getOrdersAtPrice(price, 1, 2, 2, {"from": account})
+    past_end = order_book.getOrdersAtPrice(price, 1, 3, 2, {"from": account})
+
+    # Assert
+    assert first_page == [
+        (1, account.address, amount, 0),
+        (2, account.address, 2 * amount, amount),
+    ]
+    assert second_page == [(3, account.address, 3 * amount, 3 * amount)]
+    assert past_end == []
+
+
+def test_getOrdersAtPrice_fail_market_side(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Side must be Bid or Ask"):
+        order_book.getOrdersAtPrice(10**18, 2, 0, 10, {"from": account})
+
+
+# endregion
+
+
 # region getMarketOrderAveragePrice
 def test_getMarketOrderAveragePrice_success_marketbuy_single_complete(
     order_book, account
@@ -2687,3 +3087,125 @@ def test_getMarketOrderAveragePrice_fail_no_orders(order_book, account):
 
 
 # endregion
+
+
+# region events
+def test_events_success_order_placed(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    price = 1 * 10**18
+    amount = 10 * 10**18
+
+    # Act
+    tx = order_book.addBid(price, amount, {"from": account})
+
+    # Assert
+    assert tx.events["OrderPlaced"]["orderId"] == 1
+    assert tx.events["OrderPlaced"]["maker"] == account
+    assert tx.events["OrderPlaced"]["price"] == price
+    assert tx.events["OrderPlaced"]["amount"] == amount
+    assert tx.events["OrderPlaced"]["orderType"] == 0
+    assert "OrderMatched" not in tx.events
+
+
+def test_events_success_order_matched_and_filled(
+    order_book, book_token, supply, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    asker = get_account(index=1)
+    price = 1 * 10**18
+    ask = 10 * 10**18
+    bid = 15 * 10**18
+    book_token.mint(asker, supply, {"from": asker})
+    book_token.approve(order_book, supply, {"from": asker})
+    order_book.addAsk(price, ask, {"from": asker})
+
+    # Act
+    tx = order_book.addBid(price, bid, {"from": account})
+
+    # Assert
+    assert tx.events["OrderMatched"]["bidId"] == 2
+    assert tx.events["OrderMatched"]["askId"] == 1
+    assert tx.events["OrderMatched"]["price"] == price
+    assert tx.events["OrderMatched"]["amount"] == ask
+    assert len(tx.events["OrderFilled"]) == 1
+    assert tx.events["OrderFilled"]["orderId"] == 1
+    assert tx.events["OrderFilled"]["maker"] == asker
+    assert tx.events["OrderFilled"]["price"] == price
+
+
+def test_events_success_order_cancelled(order_book, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    price = 1 * 10**18
+    amount = 10 * 10**18
+    order_book.addAsk(price, amount, {"from": account})
+
+    # Act
+    tx = order_book.cancelOrder(1, {"from": account})
+
+    # Assert
+    assert tx.events["OrderCancelled"]["orderId"] == 1
+    assert tx.events["OrderCancelled"]["maker"] == account
+    assert tx.events["OrderCancelled"]["price"] == price
+    assert tx.events["OrderCancelled"]["amount"] == amount
+
+
+def test_events_success_market_order_remainder(order_book, book_token, supply, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    asker = get_account(index=1)
+    price = 1 * 10**18
+    ask = 10 * 10**18
+    book_token.mint(asker, supply, {"from": asker})
+    book_token.approve(order_book, supply, {"from": asker})
+    order_book.addAsk(price, ask, {"from": asker})
+
+    # Act
+    tx = order_book.marketBuy(15 * 10**18, {"from": account})
+
+    # Assert
+    placed = tx.events["OrderPlaced"]
+    assert placed[0]["orderId"] == 2
+    assert placed[0]["price"] == 0
+    assert placed[0]["orderType"] == 2
+    assert placed[1]["orderId"] == 3
+    assert placed[1]["price"] == price
+    assert placed[1]["amount"] == 5 * 10**18
+    filled = [event["orderId"] for event in tx.events["OrderFilled"]]
+    assert filled == [1, 2]
+
+
+def test_events_success_market_order_sweeps_two_levels(
+    order_book, book_token, supply, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    asker = get_account(index=1)
+    ask = 5 * 10**18
+    book_token.mint(asker, supply, {"from": asker})
+    book_token.approve(order_book, supply, {"from": asker})
+    order_book.addAsk(1 * 10**18, ask, {"from": asker})
+    order_book.addAsk(2 * 10**18, ask, {"from": asker})
+
+    # Act
+    tx = order_book.marketBuy(2 * ask, {"from": account})
+
+    # Assert
+    filled = [(event["orderId"], event["price"]) for event in tx.events["OrderFilled"]]
+    assert filled == [(1, 1 * 10**18), (2, 2 * 10**18), (3, 15 * 10**17)]
+    assert order_book.orderID_order(3)[1] == 15 * 10**17
+
+
+# endregion
@@ -0,0 +1,265 @@
+import json
+from brownie import network, chain
+from brownie import RentDistributor
+import brownie
+import pytest
+from scripts.distribute_rent import (
+    build_tree,
+    get_held_unit_seconds,
+    get_proof,
+    write_proofs,
+)
+from scripts.utilities import get_account, LOCAL_BLOCKCHAIN_ENVIRONMENTS
+
+
+@pytest.fixture
+def entries():
+    return [
+        (get_account(index=1).address, 10 * 10**18),
+        (get_account(index=2).address, 20 * 10**18),
+        (get_account(index=3).address, 30 * 10**18),
+    ]
+
+
+@pytest.fixture
+def funded_distributor(rent_distributor, brick_token, entries, account):
+    total = sum(amount for _, amount in entries)
+    brick_token.releaseAprBrick(rent_distributor, total, {"from": account})
+    return rent_distributor
+
+
+def test_can_deploy_contract(brick_token):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    account = get_account()
+
+    # Act
+    rd = RentDistributor.deploy(brick_token, {"from": account})
+
+    # Assert
+    assert rd.brickToken() == brick_token.address
+    assert rd.currentPeriod() == 0
+
+
+# region setDistributionRoot
+def test_setDistributionRoot_success(rent_distributor, entries, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    root = build_tree(entries, workers=1)[-1][0]
+    to_block = chain.height
+
+    # Act
+    tx = rent_distributor.setDistributionRoot(root, to_block, {"from": account})
+
+    # Assert
+    assert rent_distributor.currentPeriod() == 1
+    assert rent_distributor.period_root(1) == "0x" + root.hex()
+    assert rent_distributor.period_toBlock(1) == to_block
+    assert tx.events["SetDistributionRoot"]["period"] == 1
+    assert tx.events["SetDistributionRoot"]["toBlock"] == to_block
+
+
+def test_setDistributionRoot_fail_period_already_covered(
+    rent_distributor, entries, account
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    root = build_tree(entries, workers=1)[-1][0]
+    to_block = chain.height
+    rent_distributor.setDistributionRoot(root, to_block, {"from": account})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Invalid period end"):
+        rent_distributor.setDistributionRoot(root, to_block, {"from": account})
+
+
+def test_setDistributionRoot_fail_not_owner(rent_distributor, entries):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    root = build_tree(entries, workers=1)[-1][0]
+    not_owner = get_account(1)
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Ownable: caller is not the owner"):
+        rent_distributor.setDistributionRoot(root, chain.height, {"from": not_owner})
+
+
+# endregion
+
+
+# region claim
+def test_claim_success(funded_distributor, brick_token, entries, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    levels = build_tree(entries, workers=1)
+    funded_distributor.setDistributionRoot(
+        levels[-1][0], chain.height, {"from": account}
+    )
+
+    # Act
+    for index, (holder, amount) in enumerate(entries):
+        funded_distributor.claim(
+            1, index, holder, amount, get_proof(levels, index), {"from": holder}
+        )
+
+    # Assert
+    for index, (holder, amount) in enumerate(entries):
+        assert brick_token.balanceOf(holder) == amount
+        assert funded_distributor.isClaimed(1, index)
+    assert brick_token.balanceOf(funded_distributor) == 0
+
+
+def test_claim_success_with_proofs_file(
+    funded_distributor, brick_token, entries, account, tmp_path
+):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    levels = build_tree(entries, workers=1)
+    funded_distributor.setDistributionRoot(
+        levels[-1][0], chain.height, {"from": account}
+    )
+    proofs_file = tmp_path / "period-1.jsonl"
+    write_proofs(proofs_file, entries, levels)
+
+    # Act
+    with open(proofs_file) as fp:
+        claims = [json.loads(line) for line in fp]
+    for claim in claims:
+        funded_distributor.claim(
+            1,
+            claim["index"],
+            claim["account"],
+            int(claim["amount"]),
+            claim["proof"],
+            {"from": claim["account"]},
+        )
+
+    # Assert
+    assert len(claims) == len(entries)
+    for index, (holder, amount) in enumerate(entries):
+        assert brick_token.balanceOf(holder) == amount
+        assert funded_distributor.isClaimed(1, index)
+
+
+def test_write_proofs_matches_get_proof(tmp_path):
+    # Arrange
+    entries = [(f"0x{i:040x}", (i + 1) * 10**18) for i in range(11)]
+    levels = build_tree(entries, workers=1)
+    proofs_file = tmp_path / "period-1.jsonl"
+
+    # Act
+    write_proofs(proofs_file, entries, levels)
+
+    # Assert
+    with open(proofs_file) as fp:
+        claims = [json.loads(line) for line in fp]
+    assert [claim["proof"] for claim in claims] == [
+        get_proof(levels, index) for index in range(len(entries))
+    ]
+
+
+def test_claim_fail_already_claimed(funded_distributor, entries, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    levels = build_tree(entries, workers=1)
+    funded_distributor.setDistributionRoot(
+        levels[-1][0], chain.height, {"from": account}
+    )
+    holder, amount = entries[0]
+    proof = get_proof(levels, 0)
+    funded_distributor.claim(1, 0, holder, amount, proof, {"from": holder})
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Rent already claimed"):
+        funded_distributor.claim(1, 0, holder, amount, proof, {"from": holder})
+
+
+def test_claim_fail_invalid_proof(funded_distributor, entries, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    levels = build_tree(entries, workers=1)
+    funded_distributor.setDistributionRoot(
+        levels[-1][0], chain.height, {"from": account}
+    )
+    holder, amount = entries[0]
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Invalid proof"):
+        funded_distributor.claim(
+            1, 0, holder, amount + 1, get_proof(levels, 0), {"from": holder}
+        )
+
+
+def test_claim_fail_unknown_period(funded_distributor, entries):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    holder, amount = entries[0]
+
+    # Act
+
+    # Assert
+    with brownie.reverts("Unknown period"):
+        funded_distributor.claim(1, 0, holder, amount, [], {"from": holder})
+
+
+# endregion
+
+
+# region get_held_unit_seconds
+def test_get_held_unit_seconds_counts_only_the_period(coincrete_asset, account):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing")
+
+    # Arrange
+    holder = get_account(index=1)
+    late_buyer = get_account(index=2)
+    coincrete_asset.setTotalSupply(1, 100, {"from": account})
+    coincrete_asset.mint(1, 30, {"from": account})
+    coincrete_asset.safeTransferFrom(account, holder, 1, 10, "", {"from": account})
+    start_tx = coincrete_asset.startRentDistribution({"from": account})
+    chain.sleep(10 * 24 * 60 * 60)
+    transfer_tx = coincrete_asset.safeTransferFrom(
+        account, late_buyer, 1, 20, "", {"from": account}
+    )
+    chain.sleep(60)
+    chain.mine()
+    end_time = chain[-1].timestamp
+
+    # Act
+    held = get_held_unit_seconds(coincrete_asset, start_tx.block_number, chain.height)
+
+    # Assert
+    assert held[holder.address] == {1: 10 * (end_time - start_tx.timestamp)}
+    assert held[late_buyer.address] == {1: 20 * (end_time - transfer_tx.timestamp)}
+    assert held[account.address] == {
+        1: 20 * (transfer_tx.timestamp - start_tx.timestamp)
+    }
+
+
+# endregion
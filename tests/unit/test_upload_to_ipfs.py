@@ -0,0 +1,169 @@
+import hashlib
+import pytest
+from scripts import upload_to_ipfs
+from scripts.upload_to_ipfs import (
+    CID_CHUNK_SIZE,
+    compute_cid,
+    compute_directory_cid,
+    write_car,
+)
+
+
+@pytest.fixture
+def write_file(tmp_path):
+    def _write_file(name, content):
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+
+    return _write_file
+
+
+# region compute_cid
+# expected CIDs are the ones `ipfs add` (kubo, default settings) gives
+@pytest.mark.parametrize(
+    "content, cid_version, expected",
+    [
+        (b"", 0, "QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH"),
+        (b"", 1, "bafkreihdwdcefgh4dqkjv67uzcmw7ojee6xedzdetojuzjevtenxquvyku"),
+        (b"hello world", 0, "Qmf412jQZiuVUtdgnB36FXFX7xg5V6KEbSJ4dpQuhkLyfD"),
+        (
+            b"hello world",
+            1,
+            "bafkreifzjut3te2nhyekklss27nh3k72ysco7y32koao5eei66wof36n5e",
+        ),
+        (b"hello world\n", 0, "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"),
+        (
+            b"hello world\n",
+            1,
+            "bafkreifjjcie6lypi6ny7amxnfftagclbuxndqonfipmb64f2km2devei4",
+        ),
+    ],
+)
+def test_compute_cid_known_vectors(write_file, content, cid_version, expected):
+    # Arrange
+    path = write_file("file", content)
+
+    # Act
+    cid = compute_cid(path, cid_version)
+
+    # Assert
+    assert cid == expected
+
+
+@pytest.mark.parametrize("cid_version", [0, 1])
+def test_compute_cid_chunked_file(write_file, cid_version):
+    # Arrange
+    chunks = [b"a" * CID_CHUNK_SIZE, b"b" * 1000]
+    path = write_file("big", b"".join(chunks))
+    leaves = [
+        upload_to_ipfs._file_dag(write_file(f"chunk{i}", chunk), cid_version)
+        for i, chunk in enumerate(chunks)
+    ]
+    root = upload_to_ipfs._dag_pb_node(
+        upload_to_ipfs._unixfs_file(blocksizes=[len(chunk) for chunk in chunks]),
+        [(cid, tsize, b"") for cid, tsize, _ in leaves],
+    )
+    expected_cid = upload_to_ipfs._cid_bytes(
+        root, upload_to_ipfs.CODEC_DAG_PB, cid_version
+    )
+
+    # Act
+    cid, tsize, size = upload_to_ipfs._file_dag(path, cid_version)
+
+    # Assert
+    assert size == CID_CHUNK_SIZE + 1000
+    assert tsize == len(root) + sum(leaf[1] for leaf in leaves)
+    assert cid == expected_cid
+    assert compute_cid(path, cid_version).startswith(
+        "Qm" if cid_version == 0 else "bafybei"
+    )
+
+
+# endregion
+
+
+# region compute_directory_cid
+@pytest.mark.parametrize(
+    "cid_version, expected",
+    [
+        (0, "QmUNLLsPACCz1vLxQVkXqqLX5R1X345qqfHbsf67hvA3Nn"),
+        (1, "bafybeiczsscdsbs7ffqz55asqdf3smv6klcw3gofszvwlyarci47bgf354"),
+    ],
+)
+def test_compute_directory_cid_empty(cid_version, expected):
+    # Arrange
+
+    # Act
+    cid = compute_directory_cid([], cid_version)
+
+    # Assert
+    assert cid == expected
+
+
+def test_compute_directory_cid_links_files_by_name(write_file):
+    # Arrange
+    beta = write_file("BETA.json", b'{"name": "BETA"}')
+    alpha = write_file("ALPHA.json", b'{"name": "ALPHA"}')
+    links = [
+        (upload_to_ipfs._file_dag(path, 0), name)
+        for path, name in [(alpha, b"ALPHA.json"), (beta, b"BETA.json")]
+    ]
+    directory = upload_to_ipfs._dag_pb_node(
+        b"\x08\x01",  # Type: Directory
+        [(cid, tsize, name) for (cid, tsize, _), name in links],
+    )
+
+    # Act
+    cid = compute_directory_cid([beta, alpha])
+
+    # Assert
+    assert cid == upload_to_ipfs._base58(
+        b"\x12\x20" + hashlib.sha256(directory).digest()
+    )
+    assert cid == compute_directory_cid([alpha, beta])
+
+
+def test_compute_directory_cid_fail_sharded(write_file, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(upload_to_ipfs, "DIRECTORY_SHARDING_SIZE", 64)
+    paths = [write_file(f"{i}.json", b"{}") for i in range(2)]
+
+    # Act
+
+    # Assert
+    with pytest.raises(ValueError):
+        compute_directory_cid(paths)
+
+
+def test_write_car_root_is_directory_cid(write_file, tmp_path):
+    # Arrange
+    paths = [write_file(f"{i}.json", b"{}") for i in range(3)]
+    car_path = tmp_path / "tokens.car"
+
+    # Act
+    cid = write_car(paths, car_path)
+
+    # Assert
+    assert cid == compute_directory_cid(paths)
+    car = car_path.read_bytes()
+    sections = []
+    offset = 0
+    while offset < len(car):
+        length, shift = 0, 0
+        while True:
+            byte = car[offset]
+            offset += 1
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        sections.append(car[offset : offset + length])
+        offset += length
+    # header, then the 3 identical files stored once and the directory
+    assert len(sections) == 3
+    assert sections[1].startswith(upload_to_ipfs._file_dag(paths[0], 0)[0])
+    assert sections[2].startswith(upload_to_ipfs._directory_dag(paths, 0))
+
+
+# endregion